@@ -5,21 +5,22 @@ import hashlib
 
 from utils.db import conn
 from utils.services import (
-    get_usage, increment_usage, increment_plays, record_journey,
+    increment_plays, record_journey,
     propose_scenario, approve_scenario, reject_scenario,
     release_scenario_early, load_categories, load_scenarios,
-    get_setting
+    load_channels, get_setting, DEFAULT_CHANNEL
 )
 from utils.llm import call_llm
+from utils import resilience
 from utils.ui import (
     render_landing_page, render_play_page, render_archive_page,
-    render_propose_page, render_curate_page, MODEL_OPTIONS,
+    render_propose_page, render_curate_page, render_ops_page, MODEL_OPTIONS,
     render_cat_game
 )
 
 
 CATEGORIES = load_categories()
-SCENARIOS = load_scenarios()
+CHANNELS = load_channels()
 
 # --- UI ---
 st.set_page_config(page_title="The Choices We Make", layout="centered")
@@ -27,7 +28,7 @@ st.title("The Choices We Make")
 st.markdown("*A social experiment in recording choices for difficult problems*")
 
 # Navigation State Management
-nav_options = ["How it Works", "Play", "Archive", "Propose New Choice", "Curate (Admin)"]
+nav_options = ["How it Works", "Play", "Archive", "Propose New Choice", "Curate (Admin)", "Operations (Admin)"]
 
 if "current_page" not in st.session_state:
     st.session_state.current_page = "How it Works"
@@ -45,6 +46,27 @@ st.sidebar.radio(
     on_change=on_nav_change
 )
 
+# Channel: ?channel=<id> picks the initial one; the selector only shows once there is a choice.
+if st.session_state.get("channel_id") not in CHANNELS:
+    requested = st.query_params.get("channel", DEFAULT_CHANNEL)
+    st.session_state.channel_id = requested if requested in CHANNELS else DEFAULT_CHANNEL
+if len(CHANNELS) > 1:
+    st.sidebar.selectbox(
+        "Channel",
+        list(CHANNELS),
+        format_func=lambda channel_id: CHANNELS[channel_id]["name"],
+        key="channel_id"
+    )
+CHANNEL = st.session_state.channel_id
+SCENARIOS = load_scenarios(CHANNEL)
+
+queued = resilience.spooled_count()
+if resilience.degraded() or queued:
+    st.sidebar.warning(
+        "The archive database is unreachable, so you may be seeing slightly older scenarios and journeys."
+        + (f" {queued} recorded change(s) will be saved once it is back." if queued else "")
+    )
+
 def on_model_change():
     st.session_state.current_model = MODEL_OPTIONS[st.session_state.play_model]
 
@@ -61,10 +83,13 @@ elif st.session_state.current_page == "Play":
     render_play_page(SCENARIOS)
 
 elif st.session_state.current_page == "Archive":
-    render_archive_page()
+    render_archive_page(CHANNEL)
 
 elif st.session_state.current_page == "Propose New Choice":
-    render_propose_page(CATEGORIES)
+    render_propose_page(CATEGORIES, CHANNEL)
 
 elif st.session_state.current_page == "Curate (Admin)":
-    render_curate_page(CATEGORIES)
+    render_curate_page(CATEGORIES, CHANNEL)
+
+elif st.session_state.current_page == "Operations (Admin)":
+    render_ops_page()
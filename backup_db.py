@@ -0,0 +1,464 @@
+"""
+Parallel, incremental database backups with content-addressed deduplication.
+
+    python backup_db.py backup [--jobs 4]          # nightly snapshot (replaces backup_db.sh)
+    python backup_db.py full [--jobs 4]            # parallel directory-format pg_dump
+    python backup_db.py verify [NAME]              # re-hash every object a backup references
+    python backup_db.py restore NAME --target DBNAME [--jobs 4]
+    python backup_db.py prune [--keep-days 14]
+    python backup_db.py list
+
+A snapshot dumps every table except journeys in parallel, all inside one exported
+snapshot so the tables are mutually consistent. Each dump is stored once under
+objects/ by the SHA-256 of its contents, so unchanged tables cost nothing after
+the first night. Journeys are captured incrementally: only rows inserted or
+updated (journeys.changed_at) since the previous snapshot's watermark are
+copied, and a snapshot lists the full chain of increments needed to rebuild
+the table. A new chain, starting with a full copy, begins every
+FULL_CHAIN_DAYS, so deleted rows drop out of backups within a week.
+
+Runs on the host against the port mapped in docker-compose.yaml and needs the
+PostgreSQL client tools (pg_dump, pg_restore, psql). DB_USER must see the
+app's transactions in pg_stat_activity (the same role, or pg_read_all_stats).
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_USER = os.getenv("DB_USER", "choices_user")
+DB_NAME = os.getenv("DB_NAME", "choices_archive")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5433")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "your_very_strong_password_here")
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+
+OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+SNAPSHOTS_DIR = os.path.join(BACKUP_DIR, "snapshots")
+FULL_DIR = os.path.join(BACKUP_DIR, "full")
+
+# Margin re-read below each watermark; restores keep the newest copy of each row.
+WATERMARK_OVERLAP = timedelta(minutes=10)
+FULL_CHAIN_DAYS = 7
+CHUNK = 1 << 20
+
+# journeys' columns in the order they were added, for increments taken before
+# manifests recorded their columns (they were copied with SELECT *).
+LEGACY_JOURNEY_COLUMNS = ["id", "llm_model", "scenario_title", "choice_text", "summary", "author",
+                          "submitted_at", "channel_id", "scenario_id"]
+
+
+def log(message):
+    print(f"[{datetime.now()}] {message}", flush=True)
+
+
+def pg_env():
+    return dict(os.environ, PGPASSWORD=DB_PASSWORD)
+
+
+def pg_args(dbname=DB_NAME):
+    return ["-h", DB_HOST, "-p", str(DB_PORT), "-U", DB_USER, "-d", dbname]
+
+
+def connect(dbname=DB_NAME):
+    return psycopg2.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, dbname=dbname)
+
+
+class Timer:
+    """Collects named step durations for the end-of-run report."""
+
+    def __init__(self):
+        self.steps = {}
+        self.started = time.monotonic()
+
+    def run(self, name, fn, *args):
+        start = time.monotonic()
+        result = fn(*args)
+        self.steps[name] = time.monotonic() - start
+        return result
+
+    def report(self, title):
+        log(f"{title} timing report:")
+        for name, seconds in sorted(self.steps.items(), key=lambda item: -item[1]):
+            print(f"  {seconds:8.2f}s  {name}")
+        print(f"  {time.monotonic() - self.started:8.2f}s  total (wall clock)")
+
+
+# --- Content-addressed object store ---
+def object_path(sha256):
+    return os.path.join(OBJECTS_DIR, f"{sha256}.gz")
+
+
+def store_stream(stream):
+    """Gzips a byte stream into the object store; returns (sha256, raw_bytes, newly_stored)."""
+    os.makedirs(OBJECTS_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=OBJECTS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as out:
+        for block in iter(lambda: stream.read(CHUNK), b""):
+            digest.update(block)
+            size += len(block)
+            out.write(block)
+    sha256 = digest.hexdigest()
+    if os.path.exists(object_path(sha256)):
+        os.remove(tmp_path)
+        return sha256, size, False
+    os.replace(tmp_path, object_path(sha256))
+    return sha256, size, True
+
+
+def object_checksum(sha256):
+    digest = hashlib.sha256()
+    with gzip.open(object_path(sha256), "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pg_dump_to_store(args, snapshot_id=None):
+    command = ["pg_dump", *pg_args(), "--no-owner", *args]
+    if snapshot_id:
+        command.append(f"--snapshot={snapshot_id}")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, env=pg_env())
+    sha256, size, new = store_stream(process.stdout)
+    if process.wait() != 0:
+        raise RuntimeError(f"pg_dump {' '.join(args)} failed")
+    return {"sha256": sha256, "bytes": size, "new": new}
+
+
+# --- Snapshots ---
+def list_snapshots():
+    if not os.path.isdir(SNAPSHOTS_DIR):
+        return []
+    return sorted(name for name in os.listdir(SNAPSHOTS_DIR) if os.path.exists(manifest_path(name)))
+
+
+def manifest_path(name):
+    return os.path.join(SNAPSHOTS_DIR, name, "manifest.json")
+
+
+def load_manifest(name):
+    with open(manifest_path(name)) as f:
+        return json.load(f)
+
+
+def backed_up_tables(cursor):
+    # Partitioned journeys (relkind 'p') and its partitions are handled incrementally.
+    cursor.execute("""
+        SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind = 'r' AND NOT c.relispartition
+        ORDER BY pg_total_relation_size(c.oid) DESC
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def journey_columns(cursor):
+    cursor.execute("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = 'journeys'::regclass AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def journeys_watermark(cursor):
+    """
+    Where the increment after this one starts; read before the backup snapshot is taken.
+    A row that snapshot misses was written by a transaction already open here or begun
+    later, and changed_at is its transaction's start, so it is at or after this time.
+    """
+    cursor.execute("SELECT LEAST(clock_timestamp(), MIN(xact_start)) FROM pg_stat_activity")
+    return (cursor.fetchone()[0] - WATERMARK_OVERLAP).isoformat()
+
+
+def capture_journeys(cursor, since, until):
+    """
+    Copies journeys changed at or after `since` into the store; returns the increment record.
+    The record lists the columns copied, so a chain stays restorable after columns are added.
+    """
+    columns = journey_columns(cursor)
+    # Before migration 013 there is no change marker; late and updated rows are missed.
+    marker = "changed_at" if "changed_at" in columns else "submitted_at"
+    query = f"SELECT {', '.join(columns)} FROM journeys"
+    if since:
+        query += cursor.mogrify(f" WHERE {marker} >= %s", (since,)).decode()
+    with tempfile.TemporaryFile() as buffer:
+        cursor.copy_expert(f"COPY ({query} ORDER BY {marker}, id) TO STDOUT", buffer)
+        buffer.seek(0)
+        rows = sum(1 for _ in buffer)
+        buffer.seek(0)
+        sha256, size, _ = store_stream(buffer)
+    return {"sha256": sha256, "bytes": size, "rows": rows, "since": since, "until": until, "columns": columns}
+
+
+def backup(jobs):
+    timer = Timer()
+    name = datetime.now().strftime("%Y%m%d_%H%M%S")
+    previous = load_manifest(list_snapshots()[-1]) if list_snapshots() else None
+    chain_started = previous.get("journeys_chain_started") if previous else None
+    if chain_started and datetime.now() - datetime.fromisoformat(chain_started) < timedelta(days=FULL_CHAIN_DAYS):
+        increments = previous["journeys_increments"]
+    else:
+        increments, chain_started = [], datetime.now().isoformat()
+    since = increments[-1]["until"] if increments else None
+
+    log(f"Starting snapshot {name} of {DB_NAME} with {jobs} jobs...")
+    connection = connect()
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            until = journeys_watermark(cursor)
+    finally:
+        connection.close()
+    # Holding this transaction open keeps the exported snapshot valid for the parallel pg_dumps.
+    connection = connect()
+    connection.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT pg_export_snapshot()")
+        snapshot_id = cursor.fetchone()[0]
+        tables = backed_up_tables(cursor)
+
+        def dump_table(table):
+            return table, timer.run(f"dump {table}", pg_dump_to_store, ["--data-only", f"--table=public.{table}"], snapshot_id)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            schema_pre = pool.submit(timer.run, "dump schema (pre-data)", pg_dump_to_store, ["--section=pre-data"], snapshot_id)
+            schema_post = pool.submit(timer.run, "dump schema (post-data)", pg_dump_to_store, ["--section=post-data"], snapshot_id)
+            table_results = dict(pool.map(dump_table, tables))
+            increment = timer.run("capture journeys increment", capture_journeys, cursor, since, until)
+            schema = {"pre_data": schema_pre.result(), "post_data": schema_post.result()}
+    finally:
+        connection.close()
+
+    manifest = {
+        "name": name,
+        "database": DB_NAME,
+        "created_at": datetime.now().isoformat(),
+        "schema": schema,
+        "tables": table_results,
+        "journeys_chain_started": chain_started,
+        "journeys_increments": increments + [increment],
+    }
+    os.makedirs(os.path.dirname(manifest_path(name)), exist_ok=True)
+    with open(manifest_path(name), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    new_bytes = sum(t["bytes"] for t in table_results.values() if t["new"])
+    log(f"Snapshot {name}: {len(tables)} tables ({sum(t['new'] for t in table_results.values())} changed, "
+        f"{new_bytes} new bytes), {increment['rows']} new or changed journey rows.")
+    timer.report("Backup")
+
+
+def full(jobs):
+    timer = Timer()
+    name = datetime.now().strftime("%Y%m%d_%H%M%S")
+    target = os.path.join(FULL_DIR, name)
+    os.makedirs(FULL_DIR, exist_ok=True)
+    log(f"Starting directory-format dump to {target} with {jobs} jobs...")
+    timer.run("pg_dump -Fd", lambda: subprocess.run(
+        ["pg_dump", *pg_args(), "--no-owner", "-Fd", f"-j{jobs}", "-f", target], check=True, env=pg_env()))
+    timer.run("checksums", write_checksums, target)
+    timer.report("Full dump")
+
+
+def write_checksums(directory):
+    with open(os.path.join(directory, "SHA256SUMS"), "w") as out:
+        for filename in sorted(os.listdir(directory)):
+            if filename != "SHA256SUMS":
+                out.write(f"{file_sha256(os.path.join(directory, filename))}  {filename}\n")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Verification ---
+def snapshot_objects(manifest):
+    objects = [manifest["schema"]["pre_data"]["sha256"], manifest["schema"]["post_data"]["sha256"]]
+    objects += [t["sha256"] for t in manifest["tables"].values()]
+    objects += [i["sha256"] for i in manifest["journeys_increments"]]
+    return objects
+
+
+def verify(name, jobs):
+    """Returns True when every object (or directory-format file) matches its checksum."""
+    full_path = os.path.join(FULL_DIR, name)
+    if os.path.isdir(full_path):
+        expected = {}
+        with open(os.path.join(full_path, "SHA256SUMS")) as f:
+            for line in f:
+                checksum, filename = line.split()
+                expected[filename] = checksum
+        checks = {filename: (lambda p=os.path.join(full_path, filename): file_sha256(p)) for filename in expected}
+    else:
+        expected = {sha: sha for sha in snapshot_objects(load_manifest(name))}
+        checks = {sha: (lambda s=sha: object_checksum(s) if os.path.exists(object_path(s)) else "missing") for sha in expected}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        actual = dict(zip(checks, pool.map(lambda check: check(), checks.values())))
+    bad = [key for key in expected if actual[key] != expected[key]]
+    for key in bad:
+        log(f"CHECKSUM MISMATCH: {key} ({actual[key]})")
+    log(f"Verified {name}: {len(expected) - len(bad)}/{len(expected)} OK.")
+    return not bad
+
+
+# --- Restore ---
+def psql_load(sha256, dbname):
+    process = subprocess.Popen(["psql", *pg_args(dbname), "-q", "-v", "ON_ERROR_STOP=1", "-f", "-"],
+                               stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, env=pg_env())
+    with gzip.open(object_path(sha256), "rb") as f:
+        shutil.copyfileobj(f, process.stdin, CHUNK)
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"Loading object {sha256} into {dbname} failed")
+
+
+def increment_columns(increment):
+    if "columns" in increment:
+        return increment["columns"]
+    with gzip.open(object_path(increment["sha256"]), "rb") as f:
+        first = f.readline()
+    # COPY's text format escapes tabs inside values, so fields split cleanly
+    return LEGACY_JOURNEY_COLUMNS[:len(first.rstrip(b"\n").split(b"\t"))] if first else []
+
+
+def load_journeys(increments, dbname):
+    connection = connect(dbname)
+    try:
+        with connection, connection.cursor() as cursor:
+            target_columns = ", ".join(journey_columns(cursor))
+            # Columns an older increment lacks take their defaults (e.g. channel_id 'main') or NULL.
+            cursor.execute("CREATE TEMP TABLE journeys_restore (LIKE journeys INCLUDING DEFAULTS) ON COMMIT DROP")
+            cursor.execute("ALTER TABLE journeys_restore ADD COLUMN increment_number INTEGER")
+            for number, increment in enumerate(increments):
+                columns = increment_columns(increment)
+                if not columns:
+                    continue  # an empty increment
+                with gzip.open(object_path(increment["sha256"]), "rb") as f:
+                    cursor.copy_expert(f"COPY journeys_restore ({', '.join(columns)}) FROM STDIN", f)
+                cursor.execute("UPDATE journeys_restore SET increment_number = %s WHERE increment_number IS NULL", (number,))
+            # A row changed since it was first backed up appears in several increments (as do
+            # rows in the overlaps); the latest copy wins. Primary keys arrive with post-data,
+            # so dedupe here. Journeys already moved to cold storage stay there.
+            cursor.execute(f"""
+                INSERT INTO journeys ({target_columns})
+                SELECT DISTINCT ON (r.id) {target_columns} FROM journeys_restore r
+                WHERE NOT EXISTS (SELECT 1 FROM journey_cold_index c WHERE c.journey_id = r.id)
+                ORDER BY r.id, r.increment_number DESC
+            """)
+            return cursor.rowcount
+    finally:
+        connection.close()
+
+
+def restore(name, dbname, jobs):
+    timer = Timer()
+    if not timer.run("verify checksums", verify, name, jobs):
+        raise SystemExit("Refusing to restore from a backup that fails verification.")
+
+    full_path = os.path.join(FULL_DIR, name)
+    if os.path.isdir(full_path):
+        timer.run("pg_restore", lambda: subprocess.run(
+            ["pg_restore", *pg_args(dbname), "--no-owner", f"-j{jobs}", full_path], check=True, env=pg_env()))
+        timer.report(f"Restore of {name} into {dbname}")
+        return
+
+    manifest = load_manifest(name)
+    timer.run("schema (pre-data)", psql_load, manifest["schema"]["pre_data"]["sha256"], dbname)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(lambda item: timer.run(f"load {item[0]}", psql_load, item[1]["sha256"], dbname),
+                      manifest["tables"].items()))
+    rows = timer.run("load journeys increments", load_journeys, manifest["journeys_increments"], dbname)
+    timer.run("schema (post-data: indexes, constraints)", psql_load, manifest["schema"]["post_data"]["sha256"], dbname)
+    log(f"Restored {len(manifest['tables'])} tables and {rows} journeys into {dbname}.")
+    timer.report(f"Restore of {name} into {dbname}")
+
+
+# --- Housekeeping ---
+def prune(keep_days):
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y%m%d_%H%M%S")
+    snapshots = list_snapshots()
+    # The newest snapshot always survives: it carries the journeys watermark.
+    for name in snapshots[:-1]:
+        if name < cutoff:
+            shutil.rmtree(os.path.join(SNAPSHOTS_DIR, name))
+            log(f"Pruned snapshot {name}")
+    if os.path.isdir(FULL_DIR):
+        for name in os.listdir(FULL_DIR):
+            if name < cutoff:
+                shutil.rmtree(os.path.join(FULL_DIR, name))
+                log(f"Pruned full dump {name}")
+
+    referenced = set()
+    for name in list_snapshots():
+        referenced.update(snapshot_objects(load_manifest(name)))
+    if os.path.isdir(OBJECTS_DIR):
+        for filename in os.listdir(OBJECTS_DIR):
+            if filename.endswith(".gz") and filename[:-3] not in referenced:
+                os.remove(os.path.join(OBJECTS_DIR, filename))
+                log(f"Removed unreferenced object {filename}")
+
+
+def list_backups():
+    for name in list_snapshots():
+        manifest = load_manifest(name)
+        rows = sum(i["rows"] for i in manifest["journeys_increments"])
+        print(f"snapshot  {name}  {len(manifest['tables'])} tables, {rows} journey rows in {len(manifest['journeys_increments'])} increments")
+    if os.path.isdir(FULL_DIR):
+        for name in sorted(os.listdir(FULL_DIR)):
+            print(f"full      {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel incremental backups for The Choices We Make")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command in ("backup", "full"):
+        commands.add_parser(command).add_argument("--jobs", type=int, default=4)
+    verify_cmd = commands.add_parser("verify")
+    verify_cmd.add_argument("name", nargs="?")
+    verify_cmd.add_argument("--jobs", type=int, default=4)
+    restore_cmd = commands.add_parser("restore")
+    restore_cmd.add_argument("name")
+    restore_cmd.add_argument("--target", required=True, help="Existing, empty database to restore into")
+    restore_cmd.add_argument("--jobs", type=int, default=4)
+    commands.add_parser("prune").add_argument("--keep-days", type=int, default=14)
+    commands.add_parser("list")
+    args = parser.parse_args()
+
+    if args.command == "backup":
+        backup(args.jobs)
+    elif args.command == "full":
+        full(args.jobs)
+    elif args.command == "verify":
+        name = args.name or list_snapshots()[-1]
+        if not verify(name, args.jobs):
+            raise SystemExit(1)
+    elif args.command == "restore":
+        restore(args.name, args.target, args.jobs)
+    elif args.command == "prune":
+        prune(args.keep_days)
+    elif args.command == "list":
+        list_backups()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Batch playthroughs of one scenario by simulated players, for curators and benchmarks.
+
+    python evaluate_scenarios.py "The Parrot Problem" [--pending] [--channel main] [--model dummy|local-mock|gemini-flash]
+        [--playthroughs 50] [--concurrency 8] [--turns 4] [--personas scripted|llm|mixed]
+        [--persona-model MODEL] [--seed 0] [--json report.json] [--use-budget]
+
+Each playthrough follows the Play page: roleplay turns, the generated choice
+list, a final choice and the summary, all through utils.llm.call_llm with the
+site's prompts and task profiles. Players are scripted personas (canned lines
+and a fixed way of choosing) or LLM personas (a trait, played by
+--persona-model). Playthroughs run in a bounded thread pool; the report gives
+per-task latency percentiles, tokens, truncation and error rates, and the
+distribution of offered and final choices.
+
+Calls skip the per-visitor rate limits but are otherwise real: their tokens
+and cost count towards today's budget, which real players share, so any model
+but "dummy" needs --use-budget. The operations rollups record them under
+"eval:<scenario id>", which the Operations page leaves out. Nothing is
+recorded as a journey. The "dummy" model measures the harness alone;
+"local-mock" (with MOCK_LLM_API_BASE set) exercises routing and hedging
+without provider cost, though its tokens still count.
+LLM_ROUTER_WORKERS bounds concurrent provider requests in this process.
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit import logger as streamlit_logger
+
+from utils.db import conn
+from utils.llm import CHOICE_PROMPT, PLAY_STYLE_PROMPT, SUMMARY_PROMPT, call_llm, parse_choices
+from utils.services import EVAL_ROLLUP_PREFIX
+
+# call_llm's Streamlit lookups warn once per worker thread outside `streamlit run`.
+streamlit_logger.set_log_level("error")
+
+# Scripted players: what they say each turn (cycled) and which generated choice they take
+# (an index, or None to write their own like "Other" on the Play page).
+SCRIPTED_PERSONAS = {
+    "cautious": {
+        "lines": ["I stop and look around before doing anything.", "Who else could get hurt if I act now?", "I'd rather wait and learn more."],
+        "pick": 1,
+    },
+    "bold": {
+        "lines": ["I step forward and take charge.", "No more talking. I act.", "I push on, whatever it costs me."],
+        "pick": 0,
+    },
+    "questioner": {
+        "lines": ["Why is this happening?", "What would you do in my place?", "Is there something nobody has told me?"],
+        "pick": -1,
+    },
+    "terse": {
+        "lines": ["Okay.", "Go on.", "Hm."],
+        "pick": 2,
+    },
+    "contrarian": {
+        "lines": ["I refuse the obvious path.", "I do the opposite of what's expected.", "None of this sits right with me."],
+        "pick": None,
+        "own_choice": "Refuse every option and walk my own way",
+    },
+}
+
+LLM_PERSONA_TRAITS = [
+    "a cautious nurse who weighs harm to others above everything",
+    "an impulsive teenager who acts first and regrets later",
+    "a utilitarian engineer who counts outcomes",
+    "a devout traditionalist guided by duty and rules",
+    "a cynical journalist who suspects everyone's motives",
+    "a gentle grandparent who looks for the kindest path",
+]
+
+PERSONA_PROMPT = """
+You are playing the human in an interactive story: {trait}.
+Reply with what you say or do next, in first person, in one to three sentences.
+Stay in character. Never narrate the other characters or offer options.
+"""
+
+PICK_PROMPT = """
+You are {trait}. The story has reached its decision point. Your options:
+{options}
+Reply with the number of the option you choose, and nothing else.
+"""
+
+# call_llm reports failures in-band so the Play page can show them.
+ERROR_PREFIXES = ("Temporal anomaly:", "The collective capacity for difficult choices has been exhausted")
+
+# call_llm answers these without recording usage; every other model draws on the daily budget.
+BUDGET_FREE_MODELS = {"dummy"}
+
+
+def load_scenario(title_or_id: str, pending: bool, channel: str):
+    table = "pending_scenarios" if pending else "scenarios"
+    df = conn.query(f"""
+        SELECT id, title, prompt, opening_scene FROM {table}
+        WHERE (title = :key AND channel_id = :channel) OR id::text = :key
+        LIMIT 1
+    """, params={"key": title_or_id, "channel": channel}, ttl=0)
+    if df.empty:
+        return None
+    scenario = df.iloc[0].to_dict()
+    # Evaluation calls are rolled up apart from real play, which is keyed by the bare id.
+    scenario["rollup_scenario"] = f"{EVAL_ROLLUP_PREFIX}{scenario['id']}"
+    return scenario
+
+
+def _timed_call(calls, task, model, messages, **kwargs):
+    """call_llm, noting its latency, tokens, truncation and failure in `calls`."""
+    responses = []
+    started = time.perf_counter()
+    text = call_llm(model, messages, task=task, rate_limit=False, on_response=lambda backend, response: responses.append(response), **kwargs)
+    usage = [getattr(response, "usage", None) for response in responses]
+    calls.append({
+        "task": task,
+        "ms": (time.perf_counter() - started) * 1000,
+        # Hedged calls can be paid for twice; all responses count, the first (the winner) decides truncation.
+        "prompt_tokens": sum(getattr(u, "prompt_tokens", 0) or 0 for u in usage),
+        "completion_tokens": sum(getattr(u, "completion_tokens", 0) or 0 for u in usage),
+        "truncated": bool(responses) and responses[0].choices[0].finish_reason == "length",
+        "error": text.startswith(ERROR_PREFIXES),
+    })
+    return text
+
+
+def _flipped(messages):
+    """The dialogue from the player's side: the story's lines become the user's."""
+    swap = {"assistant": "user", "user": "assistant"}
+    return [{"role": swap[m["role"]], "content": m["content"]} for m in messages if m["role"] in swap]
+
+
+def _persona_line(persona, turn, messages, calls, persona_model, scenario):
+    if persona["kind"] == "scripted":
+        lines = SCRIPTED_PERSONAS[persona["name"]]["lines"]
+        return lines[turn % len(lines)]
+    return _timed_call(
+        calls, "persona", persona_model, _flipped(messages),
+        system_prompt=PERSONA_PROMPT.format(trait=persona["name"]), scenario=scenario
+    ).strip()
+
+
+def _persona_pick(persona, choices, calls, persona_model, scenario, rng):
+    if persona["kind"] == "scripted":
+        script = SCRIPTED_PERSONAS[persona["name"]]
+        if script["pick"] is None or not choices:
+            return script.get("own_choice", "Walk away")
+        return choices[script["pick"] % len(choices)]
+    if not choices:
+        return "Walk away"
+    options = "\n".join(f"{i}. {choice}" for i, choice in enumerate(choices, 1))
+    reply = _timed_call(
+        calls, "persona", persona_model,
+        [{"role": "user", "content": PICK_PROMPT.format(trait=persona["name"], options=options)}],
+        scenario=scenario
+    )
+    match = re.search(r"\d+", reply)
+    if match and 1 <= int(match.group()) <= len(choices):
+        return choices[int(match.group()) - 1]
+    return rng.choice(choices)
+
+
+def play(scenario, persona, model, persona_model, turns, seed):
+    """One playthrough from the opening scene to the summary."""
+    rng = random.Random(seed)
+    rollup = scenario["rollup_scenario"]
+    calls = []
+    started = time.perf_counter()
+    messages = [
+        {"role": "system", "content": PLAY_STYLE_PROMPT + scenario["prompt"]},
+        {"role": "assistant", "content": scenario["opening_scene"]},
+    ]
+    for turn in range(turns):
+        messages.append({"role": "user", "content": _persona_line(persona, turn, messages, calls, persona_model, rollup)})
+        messages.append({"role": "assistant", "content": _timed_call(calls, "roleplay", model, messages, scenario=rollup)})
+
+    choices = parse_choices(_timed_call(calls, "choices", model, messages, system_prompt=CHOICE_PROMPT, scenario=rollup))
+    final_choice = _persona_pick(persona, choices, calls, persona_model, rollup, rng)
+    _timed_call(calls, "summary", model, messages, system_prompt=SUMMARY_PROMPT.format(final_choice=final_choice), scenario=rollup)
+    return {
+        "persona": f"{persona['kind']}: {persona['name']}",
+        "offered_choices": choices,
+        "final_choice": final_choice,
+        "seconds": time.perf_counter() - started,
+        "calls": calls,
+    }
+
+
+def personas_for(kind: str, count: int, rng) -> list:
+    scripted = [{"kind": "scripted", "name": name} for name in SCRIPTED_PERSONAS]
+    llm = [{"kind": "llm", "name": trait} for trait in LLM_PERSONA_TRAITS]
+    pool = {"scripted": scripted, "llm": llm, "mixed": scripted + llm}[kind]
+    rng.shuffle(pool)
+    return [pool[i % len(pool)] for i in range(count)]
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarise(results, wall_seconds) -> dict:
+    calls = [call for result in results for call in result["calls"]]
+    tasks = {}
+    for task in sorted({call["task"] for call in calls}):
+        task_calls = [call for call in calls if call["task"] == task]
+        latencies = [call["ms"] for call in task_calls]
+        tasks[task] = {
+            "calls": len(task_calls),
+            "p50_ms": _percentile(latencies, 0.5),
+            "p95_ms": _percentile(latencies, 0.95),
+            "max_ms": max(latencies),
+            "prompt_tokens": sum(call["prompt_tokens"] for call in task_calls),
+            "completion_tokens": sum(call["completion_tokens"] for call in task_calls),
+            "truncation_rate": sum(call["truncated"] for call in task_calls) / len(task_calls),
+            "error_rate": sum(call["error"] for call in task_calls) / len(task_calls),
+        }
+    durations = [result["seconds"] for result in results]
+    return {
+        "playthroughs": len(results),
+        "wall_seconds": wall_seconds,
+        "playthroughs_per_second": len(results) / wall_seconds if wall_seconds else 0.0,
+        "calls_per_second": len(calls) / wall_seconds if wall_seconds else 0.0,
+        "playthrough_p50_seconds": statistics.median(durations) if durations else 0.0,
+        "tasks": tasks,
+        "final_choices": Counter(result["final_choice"] for result in results).most_common(),
+        "offered_choices": Counter(choice for result in results for choice in result["offered_choices"]).most_common(),
+        "final_choice_by_persona": {
+            persona: Counter(r["final_choice"] for r in results if r["persona"] == persona).most_common()
+            for persona in sorted({r["persona"] for r in results})
+        },
+    }
+
+
+def print_report(scenario, args, summary):
+    print(f"{scenario['title']} ({'pending' if args.pending else 'live'}) · model {args.model} · "
+          f"{summary['playthroughs']} playthroughs × {args.turns} turns · concurrency {args.concurrency}")
+    print(f"Wall time {summary['wall_seconds']:.1f}s · {summary['playthroughs_per_second']:.2f} playthroughs/s · "
+          f"{summary['calls_per_second']:.1f} calls/s · median playthrough {summary['playthrough_p50_seconds']:.1f}s")
+    print()
+    print(f"{'task':<10}{'calls':>7}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'prompt tok':>12}{'compl. tok':>12}{'truncated':>11}{'errors':>8}")
+    for task, stats in summary["tasks"].items():
+        print(f"{task:<10}{stats['calls']:>7}{stats['p50_ms']:>9.0f}{stats['p95_ms']:>9.0f}{stats['max_ms']:>9.0f}"
+              f"{stats['prompt_tokens']:>12,}{stats['completion_tokens']:>12,}{stats['truncation_rate']:>11.1%}{stats['error_rate']:>8.1%}")
+    print()
+    print("Final choices:")
+    for choice, count in summary["final_choices"]:
+        print(f"  {count:>4}  {count / summary['playthroughs']:>6.1%}  {choice}")
+    print("Most offered choices:")
+    for choice, count in summary["offered_choices"][:10]:
+        print(f"  {count:>4}  {choice}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play one scenario through many simulated players in parallel")
+    parser.add_argument("scenario", help="Title or id")
+    parser.add_argument("--pending", action="store_true", help="Look the scenario up among pending submissions")
+    parser.add_argument("--channel", default="main", help="Channel a title is looked up in (titles are unique per channel)")
+    parser.add_argument("--model", default="dummy", help="AI Mind playing the scenario (dummy, local-mock, gemini-flash)")
+    parser.add_argument("--persona-model", help="Model playing LLM personas (default: --model)")
+    parser.add_argument("--personas", choices=["scripted", "llm", "mixed"], default="scripted")
+    parser.add_argument("--playthroughs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8, help="Playthroughs in flight at once")
+    parser.add_argument("--turns", type=int, default=4, help="Player turns before choosing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the summary and every playthrough to this file")
+    parser.add_argument("--use-budget", action="store_true",
+                        help="Allow models other than dummy, whose usage counts against today's shared LLM budget")
+    args = parser.parse_args()
+    spending = {args.model, args.persona_model or args.model} - BUDGET_FREE_MODELS
+    if spending and not args.use_budget:
+        parser.error(f"{', '.join(sorted(spending))} would spend today's LLM budget for real players; pass --use-budget to run anyway")
+
+    scenario = load_scenario(args.scenario, args.pending, args.channel)
+    if scenario is None:
+        parser.error(f"No {'pending' if args.pending else 'live'} scenario titled or with id {args.scenario!r}")
+    rng = random.Random(args.seed)
+    personas = personas_for(args.personas, args.playthroughs, rng)
+    persona_model = args.persona_model or args.model
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="playthrough") as pool:
+        results = list(pool.map(
+            lambda i: play(scenario, personas[i], args.model, persona_model, args.turns, args.seed + i),
+            range(args.playthroughs)
+        ))
+    summary = summarise(results, time.perf_counter() - started)
+
+    print_report(scenario, args, summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scenario": scenario["title"], "model": args.model, "summary": summary, "playthroughs": results}, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
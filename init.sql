@@ -18,10 +18,31 @@ INSERT INTO categories (name, description) VALUES
 ('Explorations', 'Open-ended speculative futures and thought experiments')
 ON CONFLICT (name) DO NOTHING;
 
+-- Channels: independently curated catalogs, addressed by slug (?channel=<id>)
+CREATE TABLE IF NOT EXISTS channels (
+  id TEXT PRIMARY KEY CHECK (id ~ '^[a-z0-9][a-z0-9-]{0,39}$'),
+  name TEXT NOT NULL,
+  description TEXT,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO channels (id, name, description) VALUES
+('main', 'The Choices We Make', 'The original archive of difficult choices')
+ON CONFLICT (id) DO NOTHING;
+
+-- Per-channel moderators; password_hash is a SHA-256 hex digest, like ADMIN_PASSWORD_HASH
+CREATE TABLE IF NOT EXISTS channel_moderators (
+  channel_id TEXT NOT NULL REFERENCES channels (id) ON DELETE CASCADE,
+  name TEXT NOT NULL,
+  password_hash TEXT NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (channel_id, name)
+);
+
 -- Scenarios (live)
 CREATE TABLE IF NOT EXISTS scenarios (
   id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-  title TEXT NOT NULL UNIQUE,
+  title TEXT NOT NULL,
   description TEXT NOT NULL,
   prompt TEXT NOT NULL,
   author TEXT,
@@ -30,9 +51,14 @@ CREATE TABLE IF NOT EXISTS scenarios (
   plays INTEGER DEFAULT 0,
   release_date TIMESTAMP,  -- NULL = immediate
   opening_scene TEXT,
-  soundtrack TEXT
+  soundtrack TEXT,
+  channel_id TEXT NOT NULL DEFAULT 'main' REFERENCES channels (id)
 );
 
+CREATE INDEX IF NOT EXISTS scenarios_channel_idx ON scenarios (channel_id, submitted_at DESC);
+-- Titles are unique within a channel; channels may reuse each other's
+CREATE UNIQUE INDEX IF NOT EXISTS scenarios_channel_title_idx ON scenarios (channel_id, title);
+
 -- Pending submissions
 CREATE TABLE IF NOT EXISTS pending_scenarios (
   id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -45,25 +71,231 @@ CREATE TABLE IF NOT EXISTS pending_scenarios (
   status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'approved', 'rejected')),
   release_date TIMESTAMP,
   opening_scene TEXT,
-  soundtrack TEXT
+  soundtrack TEXT,
+  channel_id TEXT NOT NULL DEFAULT 'main' REFERENCES channels (id)
+);
+
+CREATE INDEX IF NOT EXISTS pending_scenarios_channel_idx ON pending_scenarios (channel_id, status);
+
+-- Near-duplicate detection: MinHash signature per live/pending scenario ...
+CREATE TABLE IF NOT EXISTS scenario_minhash (
+  source TEXT NOT NULL CHECK (source IN ('live', 'pending')),
+  scenario_id UUID NOT NULL,
+  title TEXT NOT NULL,
+  signature BYTEA NOT NULL,
+  updated_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (source, scenario_id)
 );
 
+-- ... and its LSH band buckets; scenarios sharing a bucket are duplicate candidates
+CREATE TABLE IF NOT EXISTS scenario_lsh_buckets (
+  band SMALLINT NOT NULL,
+  bucket BIGINT NOT NULL,
+  source TEXT NOT NULL,
+  scenario_id UUID NOT NULL,
+  PRIMARY KEY (band, bucket, source, scenario_id)
+);
+
+CREATE INDEX IF NOT EXISTS scenario_lsh_buckets_scenario_idx ON scenario_lsh_buckets (source, scenario_id);
+
+-- Journeys, range-partitioned by month on submitted_at.
+-- Old partitions are moved to cold storage by journey_archive.py.
 CREATE TABLE IF NOT EXISTS journeys (
-  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  id UUID NOT NULL DEFAULT uuid_generate_v4(),
   llm_model TEXT NOT NULL,
   scenario_title TEXT NOT NULL,
   choice_text TEXT NOT NULL,
   summary TEXT,
   author TEXT,
-  submitted_at TIMESTAMP DEFAULT NOW()
+  submitted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  channel_id TEXT NOT NULL DEFAULT 'main' REFERENCES channels (id),
+  -- The scenario played; NULL for the Black Dragon, which has no scenarios row.
+  -- scenario_title keeps the title as it was when the journey was recorded.
+  scenario_id UUID REFERENCES scenarios (id),
+  -- Last insert or update (kept by journeys_changed_at); backup_db.py captures by it.
+  changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (id, submitted_at)
+) PARTITION BY RANGE (submitted_at);
+
+-- Safety net for rows outside every monthly partition; emptied by ensure_journey_partitions
+CREATE TABLE IF NOT EXISTS journeys_default PARTITION OF journeys DEFAULT;
+
+-- Archive pages are read newest first
+CREATE INDEX IF NOT EXISTS journeys_submitted_at_idx ON journeys (submitted_at DESC);
+CREATE INDEX IF NOT EXISTS journeys_channel_idx ON journeys (channel_id, submitted_at DESC);
+CREATE INDEX IF NOT EXISTS journeys_scenario_idx ON journeys (scenario_id, submitted_at DESC);
+CREATE INDEX IF NOT EXISTS journeys_changed_at_idx ON journeys (changed_at);
+
+CREATE OR REPLACE FUNCTION journeys_touch_changed_at() RETURNS TRIGGER AS $$
+BEGIN
+  NEW.changed_at := NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS journeys_changed_at ON journeys;
+CREATE TRIGGER journeys_changed_at BEFORE INSERT OR UPDATE ON journeys
+  FOR EACH ROW EXECUTE FUNCTION journeys_touch_changed_at();
+
+-- Creates monthly partitions from `since` (default: this month) through `months_ahead`
+-- months from now, moving any matching rows out of journeys_default first.
+CREATE OR REPLACE FUNCTION ensure_journey_partitions(months_ahead INTEGER DEFAULT 3, since DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+  month_start DATE := date_trunc('month', COALESCE(since, CURRENT_DATE))::DATE;
+  last_month DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead))::DATE;
+  part_name TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE month_start <= last_month LOOP
+    part_name := format('journeys_%s', to_char(month_start, 'YYYY_MM'));
+    -- Months already moved to cold storage are not recreated
+    IF to_regclass(part_name) IS NULL
+       AND NOT EXISTS (SELECT 1 FROM journey_cold_partitions c WHERE c.partition_name = part_name) THEN
+      EXECUTE format('CREATE TABLE %I (LIKE journeys INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part_name);
+      EXECUTE format(
+        'WITH moved AS (DELETE FROM journeys_default WHERE submitted_at >= %L AND submitted_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        month_start, month_start + INTERVAL '1 month', part_name
+      );
+      EXECUTE format(
+        'ALTER TABLE journeys ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part_name, month_start, month_start + INTERVAL '1 month'
+      );
+      created := created + 1;
+    END IF;
+    month_start := (month_start + INTERVAL '1 month')::DATE;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cold storage: one row per partition exported by journey_archive.py ...
+CREATE TABLE IF NOT EXISTS journey_cold_partitions (
+  partition_name TEXT PRIMARY KEY,
+  range_start TIMESTAMP NOT NULL,
+  range_end TIMESTAMP NOT NULL,
+  file_path TEXT NOT NULL,
+  format TEXT NOT NULL,
+  row_count INTEGER NOT NULL,
+  sha256 TEXT NOT NULL,
+  archived_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ... and a queryable index of every journey in those files
+CREATE TABLE IF NOT EXISTS journey_cold_index (
+  journey_id UUID PRIMARY KEY,
+  partition_name TEXT NOT NULL REFERENCES journey_cold_partitions (partition_name),
+  row_number INTEGER NOT NULL,
+  block_offset BIGINT,  -- byte offset of the row's gzip member in a jsonl file; NULL for parquet and older files
+  scenario_title TEXT NOT NULL,
+  llm_model TEXT,
+  author TEXT,
+  submitted_at TIMESTAMP NOT NULL,
+  scenario_id UUID
+);
+
+CREATE INDEX IF NOT EXISTS journey_cold_index_scenario_idx ON journey_cold_index (scenario_title, submitted_at);
+CREATE INDEX IF NOT EXISTS journey_cold_index_scenario_id_idx ON journey_cold_index (scenario_id, submitted_at);
+CREATE INDEX IF NOT EXISTS journey_cold_index_author_idx ON journey_cold_index (author);
+
+SELECT ensure_journey_partitions(3);
+
+-- LLM spend, aggregated per day and model; quotas are enforced against these totals
+CREATE TABLE IF NOT EXISTS llm_usage_daily (
+  day DATE NOT NULL,
+  model TEXT NOT NULL,
+  calls INTEGER NOT NULL DEFAULT 0,
+  prompt_tokens BIGINT NOT NULL DEFAULT 0,
+  completion_tokens BIGINT NOT NULL DEFAULT 0,
+  cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, model)
+);
+
+-- LLM spend per journey (keyed by the journey id assigned when play begins)
+CREATE TABLE IF NOT EXISTS journey_usage (
+  journey_id UUID PRIMARY KEY,
+  model TEXT,
+  calls INTEGER NOT NULL DEFAULT 0,
+  prompt_tokens BIGINT NOT NULL DEFAULT 0,
+  completion_tokens BIGINT NOT NULL DEFAULT 0,
+  cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Shared token buckets, used when RATE_LIMIT_BACKEND=postgres
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+  key TEXT PRIMARY KEY,
+  tokens DOUBLE PRECISION NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Ids of write batches applied through utils/resilience.py, so a replayed batch is applied once
+CREATE TABLE IF NOT EXISTS applied_writes (
+  batch_id TEXT PRIMARY KEY,
+  applied_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+CREATE INDEX IF NOT EXISTS applied_writes_applied_at_idx ON applied_writes (applied_at);
+
+-- Full journey transcripts, zstd-compressed with per-scenario dictionaries (utils/transcripts.py).
+-- Dictionaries and system prompts are stored once, keyed by the sha256 of their content.
+-- Prompts are copied rather than referenced from scenarios: a scenario's prompt can be
+-- edited after a journey, and the transcript must keep the one that was actually played.
+-- scenario_id is NULL for the Black Dragon, whose transcripts always use a raw dictionary.
+CREATE TABLE IF NOT EXISTS transcript_dictionaries (
+  id TEXT PRIMARY KEY,
+  scenario_id UUID REFERENCES scenarios (id),
+  scenario_title TEXT NOT NULL,
+  kind TEXT NOT NULL,  -- 'raw' (seeded from prompt and opening scene) or 'trained'
+  sample_count INTEGER NOT NULL DEFAULT 0,
+  dictionary BYTEA NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS transcript_dictionaries_scenario_idx ON transcript_dictionaries (scenario_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS transcript_prompts (
+  sha256 TEXT PRIMARY KEY,
+  content TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS journey_transcripts (
+  journey_id UUID PRIMARY KEY,
+  scenario_id UUID REFERENCES scenarios (id),
+  scenario_title TEXT NOT NULL,
+  prompt_sha256 TEXT REFERENCES transcript_prompts (sha256),
+  dictionary_id TEXT NOT NULL REFERENCES transcript_dictionaries (id),
+  message_count INTEGER NOT NULL,
+  raw_bytes INTEGER NOT NULL,
+  transcript BYTEA NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS journey_transcripts_scenario_idx ON journey_transcripts (scenario_id, created_at);
+
+-- Hourly operational counters, kept up to date by utils/services.py as events happen.
+-- scenario is the scenario's id (the Black Dragon's title, as it has none); scenario/model
+-- are '' for counters that don't have that dimension.
+CREATE TABLE IF NOT EXISTS ops_rollup_hourly (
+  bucket TIMESTAMP NOT NULL,
+  scenario TEXT NOT NULL DEFAULT '',
+  model TEXT NOT NULL DEFAULT '',
+  plays INTEGER NOT NULL DEFAULT 0,
+  journeys INTEGER NOT NULL DEFAULT 0,
+  llm_calls INTEGER NOT NULL DEFAULT 0,
+  llm_errors INTEGER NOT NULL DEFAULT 0,
+  llm_latency_ms BIGINT NOT NULL DEFAULT 0,  -- summed over successful calls
+  llm_latency_max_ms INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, scenario, model)
+);
 
 -- Initial settings
 INSERT INTO settings (key, value) VALUES
-('daily_limit', '150'),
-('current_date', CURRENT_DATE::TEXT),
-('current_count', '0')
+('daily_token_limit', '3000000'),  -- prompt + completion tokens per day, 0 = unlimited
+('daily_cost_limit', '5.00'),  -- USD per day, 0 = unlimited
+('catalog_version:main', '1'),  -- per channel, see api.py
+('archive_version:main', '1')
 ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
 
 
@@ -0,0 +1,10 @@
+-- Data versions for the read-only JSON API (api.py) and the archive index.
+-- init.sql already contains these for fresh databases; apply this to existing ones:
+--   psql "$DATABASE_URL" -f migrations/001_api_data_versions.sql
+
+CREATE INDEX IF NOT EXISTS journeys_submitted_at_idx ON journeys (submitted_at DESC);
+
+INSERT INTO settings (key, value) VALUES
+('catalog_version', '1'),
+('archive_version', '1')
+ON CONFLICT (key) DO NOTHING;
@@ -0,0 +1,28 @@
+-- Token- and cost-based quota accounting, replacing the daily request counter.
+
+CREATE TABLE IF NOT EXISTS llm_usage_daily (
+  day DATE NOT NULL,
+  model TEXT NOT NULL,
+  calls INTEGER NOT NULL DEFAULT 0,
+  prompt_tokens BIGINT NOT NULL DEFAULT 0,
+  completion_tokens BIGINT NOT NULL DEFAULT 0,
+  cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, model)
+);
+
+CREATE TABLE IF NOT EXISTS journey_usage (
+  journey_id UUID PRIMARY KEY,
+  model TEXT,
+  calls INTEGER NOT NULL DEFAULT 0,
+  prompt_tokens BIGINT NOT NULL DEFAULT 0,
+  completion_tokens BIGINT NOT NULL DEFAULT 0,
+  cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO settings (key, value) VALUES
+('daily_token_limit', '3000000'),
+('daily_cost_limit', '5.00')
+ON CONFLICT (key) DO NOTHING;
+
+DELETE FROM settings WHERE key IN ('daily_limit', 'current_date', 'current_count');
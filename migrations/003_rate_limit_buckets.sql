@@ -0,0 +1,7 @@
+-- Shared token buckets for RATE_LIMIT_BACKEND=postgres (multi-replica deployments).
+
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+  key TEXT PRIMARY KEY,
+  tokens DOUBLE PRECISION NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,97 @@
+-- Convert journeys into a monthly range-partitioned table with cold-storage bookkeeping.
+-- Existing rows are copied into the new parent and sorted into monthly partitions.
+-- Takes an exclusive lock on journeys for the duration; run during a quiet period.
+
+BEGIN;
+
+ALTER TABLE journeys RENAME TO journeys_unpartitioned;
+ALTER TABLE journeys_unpartitioned RENAME CONSTRAINT journeys_pkey TO journeys_unpartitioned_pkey;
+ALTER INDEX IF EXISTS journeys_submitted_at_idx RENAME TO journeys_unpartitioned_submitted_at_idx;
+
+-- Journeys, range-partitioned by month on submitted_at.
+-- Old partitions are moved to cold storage by journey_archive.py.
+CREATE TABLE journeys (
+  id UUID NOT NULL DEFAULT uuid_generate_v4(),
+  llm_model TEXT NOT NULL,
+  scenario_title TEXT NOT NULL,
+  choice_text TEXT NOT NULL,
+  summary TEXT,
+  author TEXT,
+  submitted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (id, submitted_at)
+) PARTITION BY RANGE (submitted_at);
+
+-- Safety net for rows outside every monthly partition; emptied by ensure_journey_partitions
+CREATE TABLE journeys_default PARTITION OF journeys DEFAULT;
+
+-- Archive pages are read newest first
+CREATE INDEX journeys_submitted_at_idx ON journeys (submitted_at DESC);
+
+-- Creates monthly partitions from `since` (default: this month) through `months_ahead`
+-- months from now, moving any matching rows out of journeys_default first.
+CREATE OR REPLACE FUNCTION ensure_journey_partitions(months_ahead INTEGER DEFAULT 3, since DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+  month_start DATE := date_trunc('month', COALESCE(since, CURRENT_DATE))::DATE;
+  last_month DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead))::DATE;
+  part_name TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE month_start <= last_month LOOP
+    part_name := format('journeys_%s', to_char(month_start, 'YYYY_MM'));
+    -- Months already moved to cold storage are not recreated
+    IF to_regclass(part_name) IS NULL
+       AND NOT EXISTS (SELECT 1 FROM journey_cold_partitions c WHERE c.partition_name = part_name) THEN
+      EXECUTE format('CREATE TABLE %I (LIKE journeys INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part_name);
+      EXECUTE format(
+        'WITH moved AS (DELETE FROM journeys_default WHERE submitted_at >= %L AND submitted_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        month_start, month_start + INTERVAL '1 month', part_name
+      );
+      EXECUTE format(
+        'ALTER TABLE journeys ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part_name, month_start, month_start + INTERVAL '1 month'
+      );
+      created := created + 1;
+    END IF;
+    month_start := (month_start + INTERVAL '1 month')::DATE;
+  END LOOP;
+  RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cold storage: one row per partition exported by journey_archive.py ...
+CREATE TABLE journey_cold_partitions (
+  partition_name TEXT PRIMARY KEY,
+  range_start TIMESTAMP NOT NULL,
+  range_end TIMESTAMP NOT NULL,
+  file_path TEXT NOT NULL,
+  format TEXT NOT NULL,
+  row_count INTEGER NOT NULL,
+  sha256 TEXT NOT NULL,
+  archived_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ... and a queryable index of every journey in those files
+CREATE TABLE journey_cold_index (
+  journey_id UUID PRIMARY KEY,
+  partition_name TEXT NOT NULL REFERENCES journey_cold_partitions (partition_name),
+  row_number INTEGER NOT NULL,
+  scenario_title TEXT NOT NULL,
+  llm_model TEXT,
+  author TEXT,
+  submitted_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX journey_cold_index_scenario_idx ON journey_cold_index (scenario_title, submitted_at);
+CREATE INDEX journey_cold_index_author_idx ON journey_cold_index (author);
+
+INSERT INTO journeys (id, llm_model, scenario_title, choice_text, summary, author, submitted_at)
+SELECT id, llm_model, scenario_title, choice_text, summary, author, COALESCE(submitted_at, NOW())
+FROM journeys_unpartitioned;
+
+SELECT ensure_journey_partitions(3, (SELECT MIN(submitted_at)::DATE FROM journeys));
+
+DROP TABLE journeys_unpartitioned;
+
+COMMIT;
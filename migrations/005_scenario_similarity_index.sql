@@ -0,0 +1,23 @@
+-- MinHash/LSH index for near-duplicate scenario detection.
+-- Existing scenarios are indexed by the next `journey_archive.py maintain` run.
+
+-- Near-duplicate detection: MinHash signature per live/pending scenario ...
+CREATE TABLE IF NOT EXISTS scenario_minhash (
+  source TEXT NOT NULL CHECK (source IN ('live', 'pending')),
+  scenario_id UUID NOT NULL,
+  title TEXT NOT NULL,
+  signature BYTEA NOT NULL,
+  updated_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (source, scenario_id)
+);
+
+-- ... and its LSH band buckets; scenarios sharing a bucket are duplicate candidates
+CREATE TABLE IF NOT EXISTS scenario_lsh_buckets (
+  band SMALLINT NOT NULL,
+  bucket BIGINT NOT NULL,
+  source TEXT NOT NULL,
+  scenario_id UUID NOT NULL,
+  PRIMARY KEY (band, bucket, source, scenario_id)
+);
+
+CREATE INDEX IF NOT EXISTS scenario_lsh_buckets_scenario_idx ON scenario_lsh_buckets (source, scenario_id);
@@ -0,0 +1,21 @@
+-- Hourly rollups behind the Operations (Admin) page.
+
+CREATE TABLE IF NOT EXISTS ops_rollup_hourly (
+  bucket TIMESTAMP NOT NULL,
+  scenario TEXT NOT NULL DEFAULT '',
+  model TEXT NOT NULL DEFAULT '',
+  plays INTEGER NOT NULL DEFAULT 0,
+  journeys INTEGER NOT NULL DEFAULT 0,
+  llm_calls INTEGER NOT NULL DEFAULT 0,
+  llm_errors INTEGER NOT NULL DEFAULT 0,
+  llm_latency_ms BIGINT NOT NULL DEFAULT 0,
+  llm_latency_max_ms INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, scenario, model)
+);
+
+-- Seed history from the journeys still in Postgres; plays and LLM calls start counting now.
+INSERT INTO ops_rollup_hourly (bucket, scenario, model, journeys)
+SELECT date_trunc('hour', submitted_at), COALESCE(scenario_title, ''), COALESCE(llm_model, ''), COUNT(*)
+FROM journeys
+GROUP BY 1, 2, 3
+ON CONFLICT (bucket, scenario, model) DO UPDATE SET journeys = EXCLUDED.journeys;
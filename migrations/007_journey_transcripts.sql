@@ -0,0 +1,30 @@
+-- Compressed full transcripts for recorded journeys.
+
+CREATE TABLE IF NOT EXISTS transcript_dictionaries (
+  id TEXT PRIMARY KEY,
+  scenario_title TEXT NOT NULL,
+  kind TEXT NOT NULL,  -- 'raw' (seeded from prompt and opening scene) or 'trained'
+  sample_count INTEGER NOT NULL DEFAULT 0,
+  dictionary BYTEA NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS transcript_dictionaries_scenario_idx ON transcript_dictionaries (scenario_title, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS transcript_prompts (
+  sha256 TEXT PRIMARY KEY,
+  content TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS journey_transcripts (
+  journey_id UUID PRIMARY KEY,
+  scenario_title TEXT NOT NULL,
+  prompt_sha256 TEXT REFERENCES transcript_prompts (sha256),
+  dictionary_id TEXT NOT NULL REFERENCES transcript_dictionaries (id),
+  message_count INTEGER NOT NULL,
+  raw_bytes INTEGER NOT NULL,
+  transcript BYTEA NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS journey_transcripts_scenario_idx ON journey_transcripts (scenario_title, created_at);
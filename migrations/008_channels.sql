@@ -0,0 +1,32 @@
+-- Channels: per-channel catalogs, archives and moderators.
+
+CREATE TABLE IF NOT EXISTS channels (
+  id TEXT PRIMARY KEY CHECK (id ~ '^[a-z0-9][a-z0-9-]{0,39}$'),
+  name TEXT NOT NULL,
+  description TEXT,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO channels (id, name, description) VALUES
+('main', 'The Choices We Make', 'The original archive of difficult choices')
+ON CONFLICT (id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS channel_moderators (
+  channel_id TEXT NOT NULL REFERENCES channels (id) ON DELETE CASCADE,
+  name TEXT NOT NULL,
+  password_hash TEXT NOT NULL,
+  created_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (channel_id, name)
+);
+
+-- Existing rows all belong to the main channel.
+ALTER TABLE scenarios ADD COLUMN IF NOT EXISTS channel_id TEXT NOT NULL DEFAULT 'main' REFERENCES channels (id);
+ALTER TABLE pending_scenarios ADD COLUMN IF NOT EXISTS channel_id TEXT NOT NULL DEFAULT 'main' REFERENCES channels (id);
+ALTER TABLE journeys ADD COLUMN IF NOT EXISTS channel_id TEXT NOT NULL DEFAULT 'main' REFERENCES channels (id);
+
+CREATE INDEX IF NOT EXISTS scenarios_channel_idx ON scenarios (channel_id, submitted_at DESC);
+CREATE INDEX IF NOT EXISTS pending_scenarios_channel_idx ON pending_scenarios (channel_id, status);
+CREATE INDEX IF NOT EXISTS journeys_channel_idx ON journeys (channel_id, submitted_at DESC);
+
+-- Data versions (the API's ETags) become per channel.
+UPDATE settings SET key = key || ':main' WHERE key IN ('catalog_version', 'archive_version');
@@ -0,0 +1,39 @@
+-- Journeys, transcripts and rollups refer to scenarios by id rather than by title,
+-- so renaming a scenario no longer splits or orphans its history.
+-- The Black Dragon has no scenarios row; its rows keep scenario_id NULL.
+
+BEGIN;
+
+ALTER TABLE journeys ADD COLUMN IF NOT EXISTS scenario_id UUID REFERENCES scenarios (id);
+UPDATE journeys j SET scenario_id = s.id
+FROM scenarios s
+WHERE s.title = j.scenario_title AND j.scenario_id IS NULL;
+CREATE INDEX IF NOT EXISTS journeys_scenario_idx ON journeys (scenario_id, submitted_at DESC);
+
+ALTER TABLE journey_cold_index ADD COLUMN IF NOT EXISTS scenario_id UUID;
+UPDATE journey_cold_index i SET scenario_id = s.id
+FROM scenarios s
+WHERE s.title = i.scenario_title AND i.scenario_id IS NULL;
+CREATE INDEX IF NOT EXISTS journey_cold_index_scenario_id_idx ON journey_cold_index (scenario_id, submitted_at);
+
+ALTER TABLE transcript_dictionaries ADD COLUMN IF NOT EXISTS scenario_id UUID REFERENCES scenarios (id);
+UPDATE transcript_dictionaries d SET scenario_id = s.id
+FROM scenarios s
+WHERE s.title = d.scenario_title AND d.scenario_id IS NULL;
+DROP INDEX IF EXISTS transcript_dictionaries_scenario_idx;
+CREATE INDEX transcript_dictionaries_scenario_idx ON transcript_dictionaries (scenario_id, created_at DESC);
+
+ALTER TABLE journey_transcripts ADD COLUMN IF NOT EXISTS scenario_id UUID REFERENCES scenarios (id);
+UPDATE journey_transcripts t SET scenario_id = s.id
+FROM scenarios s
+WHERE s.title = t.scenario_title AND t.scenario_id IS NULL;
+DROP INDEX IF EXISTS journey_transcripts_scenario_idx;
+CREATE INDEX journey_transcripts_scenario_idx ON journey_transcripts (scenario_id, created_at);
+
+-- Rollup rows are re-keyed from the title to the id. Titles are unique and ids never
+-- collide with them, so no two rows merge.
+UPDATE ops_rollup_hourly r SET scenario = s.id::text
+FROM scenarios s
+WHERE s.title = r.scenario;
+
+COMMIT;
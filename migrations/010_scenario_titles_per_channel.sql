@@ -0,0 +1,4 @@
+-- Scenario titles only need to be unique within their channel.
+
+CREATE UNIQUE INDEX IF NOT EXISTS scenarios_channel_title_idx ON scenarios (channel_id, title);
+ALTER TABLE scenarios DROP CONSTRAINT IF EXISTS scenarios_title_key;
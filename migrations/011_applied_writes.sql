@@ -0,0 +1,8 @@
+-- Ids of write batches applied through utils/resilience.py, so a replayed batch is applied once.
+
+CREATE TABLE IF NOT EXISTS applied_writes (
+  batch_id TEXT PRIMARY KEY,
+  applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS applied_writes_applied_at_idx ON applied_writes (applied_at);
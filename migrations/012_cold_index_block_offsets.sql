@@ -0,0 +1,4 @@
+-- Where a cold journey's compressed block starts, so journey_archive.py fetch reads only that block.
+-- Files archived before this stay one gzip stream (NULL) and are read from the start.
+
+ALTER TABLE journey_cold_index ADD COLUMN IF NOT EXISTS block_offset BIGINT;
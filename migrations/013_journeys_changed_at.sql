@@ -0,0 +1,22 @@
+-- backup_db.py captures journeys by when each row last changed rather than by submitted_at,
+-- so updates to rows already backed up (backfills, channel moves) and rows replayed late
+-- from the write spool reach the next increment.
+-- Existing rows all take this migration's time, so the next increment copies them once more.
+
+BEGIN;
+
+ALTER TABLE journeys ADD COLUMN IF NOT EXISTS changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+CREATE INDEX IF NOT EXISTS journeys_changed_at_idx ON journeys (changed_at);
+
+CREATE OR REPLACE FUNCTION journeys_touch_changed_at() RETURNS TRIGGER AS $$
+BEGIN
+  NEW.changed_at := NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS journeys_changed_at ON journeys;
+CREATE TRIGGER journeys_changed_at BEFORE INSERT OR UPDATE ON journeys
+  FOR EACH ROW EXECUTE FUNCTION journeys_touch_changed_at();
+
+COMMIT;
@@ -0,0 +1,196 @@
+"""
+Local OpenAI-compatible mock LLM server for offline and CI performance work.
+
+Implements POST /v1/chat/completions, streaming and non-streaming, with
+configurable time-to-first-token distributions, tokens per second, error
+injection and `finish_reason="length"` truncation. The profile is chosen by the
+request's model name, so LiteLLM reaches it through a model id:
+
+    python mock_llm_server.py --port 4010
+    MOCK_LLM_API_BASE=http://localhost:4010/v1 streamlit run app.py
+
+and pick "Local Mock LLM", or call litellm.completion(model="openai/mock-slow",
+api_base="http://localhost:4010/v1", api_key="mock", ...) directly.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# latency: (distribution, params) for time to first token, in seconds.
+PROFILES = {
+    "mock-fast": {"latency": ("fixed", (0.05,)), "tokens_per_second": 400, "error_rate": 0.0, "truncate_rate": 0.0},
+    "mock-typical": {"latency": ("lognormal", (-0.5, 0.5)), "tokens_per_second": 80, "error_rate": 0.01, "truncate_rate": 0.02},
+    "mock-slow": {"latency": ("uniform", (2.0, 8.0)), "tokens_per_second": 20, "error_rate": 0.0, "truncate_rate": 0.0},
+    "mock-flaky": {"latency": ("lognormal", (0.0, 1.0)), "tokens_per_second": 60, "error_rate": 0.25, "truncate_rate": 0.1},
+    "mock-truncating": {"latency": ("fixed", (0.1,)), "tokens_per_second": 200, "error_rate": 0.0, "truncate_rate": 1.0},
+}
+DEFAULT_PROFILE = "mock-typical"
+
+# Command-line overrides applied on top of every profile.
+OVERRIDES = {}
+
+NARRATIVE = (
+    "The wind shifts across the archive and the question remains unanswered. "
+    "Somewhere a door closes, and the weight of the choice settles on your shoulders. "
+    "Voices you trust disagree, each certain, each incomplete. "
+    "The evidence supports more than one story, and none of them is comfortable. "
+    "What do you do now?"
+).split()
+CHOICES = "1. Stand your ground\n2. Seek a compromise\n3. Walk away\n4. Forge a new path"
+
+
+def _profile(model: str) -> dict:
+    name = model.split("/")[-1]
+    return dict(PROFILES.get(name, PROFILES[DEFAULT_PROFILE]), **OVERRIDES)
+
+
+def _sample_latency(latency) -> float:
+    kind, params = latency
+    if kind == "fixed":
+        return params[0]
+    if kind == "uniform":
+        return random.uniform(*params)
+    if kind == "lognormal":
+        return random.lognormvariate(*params)
+    if kind == "exponential":
+        return random.expovariate(1 / params[0])
+    raise ValueError(f"Unknown latency distribution: {kind}")
+
+
+def _count_tokens(text: str) -> int:
+    # Roughly what BPE tokenizers give for English prose.
+    return max(1, round(len(text.split()) * 4 / 3))
+
+
+def _completion_tokens(messages: list, max_tokens: int, truncate: bool, json_mode: bool = False):
+    """Reply tokens (words with trailing spaces) and the finish reason."""
+    system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    if "generate 4" in system and json_mode:
+        choices = [line.split(". ", 1)[1] for line in CHOICES.split("\n")]
+        words = [word + " " for word in json.dumps({"choices": choices}).split(" ")]
+    elif "generate 4" in system:
+        words = [line + "\n" for line in CHOICES.split("\n")]
+    else:
+        length = random.randint(40, 120)
+        words = [NARRATIVE[i % len(NARRATIVE)] + " " for i in range(length)]
+    limit = max_tokens or len(words)
+    if truncate:
+        limit = min(limit, max(1, len(words) // 2))
+    if len(words) > limit:
+        return words[:limit], "length"
+    return words, "stop"
+
+
+def _error_response():
+    status = random.choice([429, 500, 503])
+    return JSONResponse(
+        {"error": {"message": f"Injected mock failure ({status})", "type": "mock_error", "code": status}},
+        status_code=status,
+    )
+
+
+async def chat_completions(request):
+    body = await request.json()
+    model = body.get("model", DEFAULT_PROFILE)
+    profile = _profile(model)
+    messages = body.get("messages", [])
+
+    await asyncio.sleep(_sample_latency(profile["latency"]))
+    if random.random() < profile["error_rate"]:
+        return _error_response()
+
+    words, finish_reason = _completion_tokens(
+        messages, body.get("max_tokens"), random.random() < profile["truncate_rate"],
+        json_mode=(body.get("response_format") or {}).get("type") in ("json_object", "json_schema"),
+    )
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    prompt_tokens = sum(_count_tokens(m.get("content") or "") for m in messages)
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(words),
+        "total_tokens": prompt_tokens + len(words),
+    }
+    per_token = 1 / profile["tokens_per_second"]
+
+    if body.get("stream"):
+        async def events():
+            def chunk(delta, finish=None, **extra):
+                return "data: " + json.dumps({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra,
+                }) + "\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for word in words:
+                await asyncio.sleep(per_token)
+                yield chunk({"content": word})
+            yield chunk({}, finish_reason, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(per_token * len(words))
+    return JSONResponse({
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(words).strip()},
+            "finish_reason": finish_reason,
+        }],
+        "usage": usage,
+    })
+
+
+async def list_models(request):
+    return JSONResponse({"object": "list", "data": [
+        {"id": name, "object": "model", "owned_by": "mock"} for name in PROFILES
+    ]})
+
+
+app = Starlette(routes=[
+    Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+    Route("/v1/models", list_models, methods=["GET"]),
+])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4010)
+    parser.add_argument("--latency", help="Override time to first token, e.g. fixed:0.2, uniform:0.1,2, lognormal:-0.5,0.5, exponential:0.5")
+    parser.add_argument("--tokens-per-second", type=float)
+    parser.add_argument("--error-rate", type=float, help="Fraction of requests answered with 429/500/503")
+    parser.add_argument("--truncate-rate", type=float, help="Fraction of replies cut short with finish_reason=length")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.latency:
+        kind, _, params = args.latency.partition(":")
+        OVERRIDES["latency"] = (kind, tuple(float(p) for p in params.split(",")))
+    if args.tokens_per_second:
+        OVERRIDES["tokens_per_second"] = args.tokens_per_second
+    if args.error_rate is not None:
+        OVERRIDES["error_rate"] = args.error_rate
+    if args.truncate_rate is not None:
+        OVERRIDES["truncate_rate"] = args.truncate_rate
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
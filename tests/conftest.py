@@ -0,0 +1,151 @@
+"""
+Shared fixtures for the tests.
+
+Most tests render real pages against a real Postgres, so they only run when
+TEST_DATABASE_URL points at a disposable database (CI provides one):
+
+    TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost:5432/choices_test python -m pytest tests
+
+An empty database is initialised from init.sql; an initialised one is used as is.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+QUERY_BUDGET_TIME_SCALE = float(os.getenv("QUERY_BUDGET_TIME_SCALE", "1"))
+
+if TEST_DATABASE_URL:
+    # utils.db reads DATABASE_URL at import time, so this has to happen first.
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+# Snapshots and spooled writes from a dev server mustn't leak into (or out of) the tests.
+os.environ.setdefault("RESILIENCE_DIR", tempfile.mkdtemp(prefix="choices-resilience-"))
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+
+def _call_site(stack) -> str:
+    """The two innermost frames in the app's own code, e.g. `services.py:8 get_setting <- ui.py:70 render_sidebar_info`."""
+    frames = [
+        frame for frame in stack
+        if frame.filename.startswith(str(REPO_ROOT))
+        and not frame.filename.startswith(str(REPO_ROOT / "tests"))
+        and not frame.filename.endswith(os.path.join("utils", "db.py"))
+    ]
+    return " <- ".join(
+        f"{os.path.relpath(frame.filename, REPO_ROOT)}:{frame.lineno} {frame.name}"
+        for frame in reversed(frames[-2:])
+    ) or "<outside app code>"
+
+
+class QueryRecorder:
+    """Counts and times every statement sent to Postgres, whether through conn.query or execute_write(s)."""
+
+    def __init__(self):
+        self.queries = []  # (call_site, sql, seconds)
+        self.recording = False
+        self._lock = threading.Lock()
+        self._started = threading.local()
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._started.at = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.recording:
+            return
+        elapsed = time.perf_counter() - getattr(self._started, "at", time.perf_counter())
+        site = _call_site(traceback.extract_stack())
+        with self._lock:
+            self.queries.append((site, " ".join(statement.split()), elapsed))
+
+    def install(self):
+        event.listen(Engine, "before_cursor_execute", self._before)
+        event.listen(Engine, "after_cursor_execute", self._after)
+
+    def uninstall(self):
+        event.remove(Engine, "before_cursor_execute", self._before)
+        event.remove(Engine, "after_cursor_execute", self._after)
+
+    def measure(self, action):
+        """Runs `action` and returns the statements it issued."""
+        with self._lock:
+            self.queries = []
+        self.recording = True
+        try:
+            action()
+        finally:
+            self.recording = False
+        return list(self.queries)
+
+
+def format_report(name, queries, max_queries, max_db_ms) -> str:
+    total_ms = sum(seconds for _, _, seconds in queries) * 1000
+    by_site = defaultdict(list)
+    for site, sql, seconds in queries:
+        by_site[site].append((sql, seconds))
+    lines = [f"{name}: {len(queries)} queries (budget {max_queries}), {total_ms:.1f} ms DB time (budget {max_db_ms:.0f} ms)"]
+    for site, calls in sorted(by_site.items(), key=lambda item: -len(item[1])):
+        site_ms = sum(seconds for _, seconds in calls) * 1000
+        lines.append(f"  {len(calls):>3}x {site_ms:8.1f} ms  {site}")
+        lines.append(f"        {calls[0][0][:110]}")
+    return "\n".join(lines)
+
+
+def pytest_report_header(config):
+    if not TEST_DATABASE_URL:
+        return "TEST_DATABASE_URL not set: the database tests will be skipped"
+
+
+@pytest.fixture(scope="session")
+def app_path() -> str:
+    return str(REPO_ROOT / "app.py")
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    try:
+        with engine.begin() as connection:
+            if connection.execute(text("SELECT to_regclass('public.settings')")).scalar() is None:
+                connection.exec_driver_sql((REPO_ROOT / "init.sql").read_text())
+    except Exception as e:
+        pytest.skip(f"Test database unavailable: {e}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def query_recorder(database):
+    recorder = QueryRecorder()
+    recorder.install()
+    yield recorder
+    recorder.uninstall()
+
+
+@pytest.fixture(scope="session")
+def assert_query_budget():
+    """
+    `assert_query_budget(name, queries, (max_queries, max_db_ms))` fails the test with a
+    call-site report when `queries` go over either budget. DB time budgets are scaled by
+    QUERY_BUDGET_TIME_SCALE for slower machines.
+    """
+    def check(name, queries, budget):
+        max_queries, max_db_ms = budget
+        max_db_ms *= QUERY_BUDGET_TIME_SCALE
+        total_ms = sum(seconds for _, _, seconds in queries) * 1000
+        if len(queries) > max_queries or total_ms > max_db_ms:
+            pytest.fail(format_report(name, queries, max_queries, max_db_ms), pytrace=False)
+    return check
@@ -0,0 +1,143 @@
+"""
+Journeys increments restore across schema changes and row updates.
+
+A backup chain is built on a scratch database while journeys changes, then
+replayed into a second scratch database with the newest schema, as
+`backup_db.py restore` does after loading pre-data.
+"""
+import io
+import uuid
+
+import psycopg2
+import pytest
+from sqlalchemy.engine import make_url
+
+import backup_db
+
+OLD_SCHEMA = """
+    CREATE TABLE journeys (
+      id UUID NOT NULL,
+      llm_model TEXT NOT NULL,
+      scenario_title TEXT NOT NULL,
+      choice_text TEXT NOT NULL,
+      summary TEXT,
+      author TEXT,
+      submitted_at TIMESTAMP NOT NULL,
+      changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+    CREATE FUNCTION journeys_touch_changed_at() RETURNS TRIGGER AS $$
+    BEGIN
+      NEW.changed_at := NOW();
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    CREATE TRIGGER journeys_changed_at BEFORE INSERT OR UPDATE ON journeys
+      FOR EACH ROW EXECUTE FUNCTION journeys_touch_changed_at();
+"""
+ADDED_COLUMNS = """
+    ALTER TABLE journeys ADD COLUMN channel_id TEXT NOT NULL DEFAULT 'main';
+    ALTER TABLE journeys ADD COLUMN scenario_id UUID;
+"""
+
+
+@pytest.fixture
+def scratch_databases(database, monkeypatch, tmp_path):
+    url = make_url(str(database.url))
+    monkeypatch.setattr(backup_db, "DB_HOST", url.host or "localhost")
+    monkeypatch.setattr(backup_db, "DB_PORT", str(url.port or 5432))
+    monkeypatch.setattr(backup_db, "DB_USER", url.username)
+    monkeypatch.setattr(backup_db, "DB_PASSWORD", url.password or "")
+    monkeypatch.setattr(backup_db, "OBJECTS_DIR", str(tmp_path / "objects"))
+
+    names = [f"{url.database}_restore_{kind}_{uuid.uuid4().hex[:8]}" for kind in ("source", "target")]
+    admin = backup_db.connect(url.database)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            for name in names:
+                cursor.execute(f'CREATE DATABASE "{name}"')
+    except psycopg2.Error as e:
+        admin.close()
+        pytest.skip(f"Can't create scratch databases: {e}")
+    yield names
+    with admin.cursor() as cursor:
+        for name in names:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{name}"')
+    admin.close()
+
+
+def _insert(cursor, title, submitted_at):
+    journey_id = str(uuid.uuid4())
+    cursor.execute(
+        "INSERT INTO journeys (id, llm_model, scenario_title, choice_text, submitted_at) VALUES (%s, 'dummy', %s, 'A', %s)",
+        (journey_id, title, submitted_at)
+    )
+    return journey_id
+
+
+def _capture(cursor, increments):
+    # As backup() does: the watermark is read before the increment is copied.
+    until = backup_db.journeys_watermark(cursor)
+    increments.append(backup_db.capture_journeys(cursor, increments[-1]["until"] if increments else None, until))
+
+
+def _restore(target, increments, schema):
+    connection = backup_db.connect(target)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(schema)
+        cursor.execute("CREATE TABLE journey_cold_index (journey_id UUID PRIMARY KEY)")
+    rows = backup_db.load_journeys(increments, target)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT scenario_title, channel_id, summary FROM journeys ORDER BY submitted_at")
+        restored = cursor.fetchall()
+    connection.close()
+    return rows, restored
+
+
+def test_restore_spans_added_columns(scratch_databases):
+    source, target = scratch_databases
+    increments = []
+    connection = backup_db.connect(source)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(OLD_SCHEMA)
+        _insert(cursor, "Before", "2024-01-01")
+        _capture(cursor, increments)
+        cursor.execute(ADDED_COLUMNS)
+        _insert(cursor, "After", "2024-02-01")
+        _capture(cursor, increments)
+    connection.close()
+
+    # An increment from before manifests recorded columns: SELECT * of the old schema.
+    legacy = io.BytesIO(b"%s\tdummy\tLegacy\tA\t\\N\t\\N\t2023-12-01 00:00:00\n" % str(uuid.uuid4()).encode())
+    sha256, size, _ = backup_db.store_stream(legacy)
+    increments.insert(0, {"sha256": sha256, "bytes": size, "rows": 1, "since": None, "until": None})
+
+    old_columns = backup_db.LEGACY_JOURNEY_COLUMNS[:7] + ["changed_at"]
+    assert increments[1]["columns"] == old_columns
+    assert increments[2]["columns"] == old_columns + ["channel_id", "scenario_id"]
+
+    rows, restored = _restore(target, increments, OLD_SCHEMA + ADDED_COLUMNS)
+    assert rows == 3
+    assert restored == [("Legacy", "main", None), ("Before", "main", None), ("After", "main", None)]
+
+
+def test_restore_takes_rows_changed_after_backup(scratch_databases):
+    source, target = scratch_databases
+    increments = []
+    connection = backup_db.connect(source)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(OLD_SCHEMA + ADDED_COLUMNS)
+        journey_id = _insert(cursor, "Backfilled", "2024-01-01")
+        _capture(cursor, increments)
+        # A backfill of a row already backed up, and a row recorded late with an old submitted_at.
+        cursor.execute("UPDATE journeys SET summary = 'Edited', channel_id = 'other' WHERE id = %s", (journey_id,))
+        _insert(cursor, "Late", "2023-06-01")
+        _capture(cursor, increments)
+    connection.close()
+
+    rows, restored = _restore(target, increments, OLD_SCHEMA + ADDED_COLUMNS)
+    assert rows == 2
+    assert restored == [("Late", "main", None), ("Backfilled", "other", "Edited")]
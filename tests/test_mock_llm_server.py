@@ -0,0 +1,124 @@
+"""
+The mock LLM server answers like an OpenAI-compatible provider.
+
+Runs in process through Starlette's TestClient, with latency and token pacing
+overridden to zero so every profile can be exercised quickly; error and
+truncation rates stay as each profile declares them. Needs no database.
+"""
+import json
+import random
+
+import pytest
+from starlette.testclient import TestClient
+
+import mock_llm_server
+from utils.llm import CHOICE_PROMPT, TASK_PROFILES, parse_choices
+
+REQUESTS_PER_PROFILE = 40
+MESSAGES = [
+    {"role": "system", "content": "You are running a test scenario."},
+    {"role": "user", "content": "I open the door and look around."},
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(mock_llm_server, "OVERRIDES", {"latency": ("fixed", (0.0,)), "tokens_per_second": 1e9})
+    random.seed(0)
+    with TestClient(mock_llm_server.app) as client:
+        yield client
+
+
+def _complete(client, model, **body):
+    return client.post("/v1/chat/completions", json={"model": f"openai/{model}", "messages": MESSAGES, **body})
+
+
+def _stream(client, model, **body):
+    """(assembled content, final chunk, number of chunks) of a streamed reply."""
+    response = _complete(client, model, stream=True, **body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line.removeprefix("data: ") for line in response.text.split("\n\n") if line]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert chunks[0]["choices"][0]["delta"]["role"] == "assistant"
+    content = "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks)
+    return content, chunks[-1], len(chunks)
+
+
+@pytest.mark.parametrize("model", list(mock_llm_server.PROFILES))
+def test_profile_replies(client, model):
+    profile = mock_llm_server.PROFILES[model]
+    statuses, finish_reasons = [], []
+    for _ in range(REQUESTS_PER_PROFILE):
+        response = _complete(client, model)
+        statuses.append(response.status_code)
+        if response.status_code != 200:
+            assert response.json()["error"]["type"] == "mock_error"
+            continue
+        reply = response.json()
+        choice = reply["choices"][0]
+        assert reply["object"] == "chat.completion" and reply["model"] == f"openai/{model}"
+        assert choice["message"]["role"] == "assistant" and choice["message"]["content"]
+        assert reply["usage"]["total_tokens"] == reply["usage"]["prompt_tokens"] + reply["usage"]["completion_tokens"]
+        finish_reasons.append(choice["finish_reason"])
+
+    assert set(statuses) <= {200, 429, 500, 503}
+    if profile["error_rate"] == 0:
+        assert set(statuses) == {200}
+    elif profile["error_rate"] >= 0.25:
+        assert set(statuses) != {200}  # all 40 succeeding is a 1e-5 chance, and the seed is fixed
+    if profile["truncate_rate"] == 1.0:
+        assert set(finish_reasons) == {"length"}
+    elif profile["truncate_rate"] == 0:
+        assert set(finish_reasons) == {"stop"}
+
+
+@pytest.mark.parametrize("model", ["mock-fast", "mock-truncating"])
+def test_streaming(client, model):
+    content, last, chunks = _stream(client, model)
+    assert content.strip()
+    assert last["object"] == "chat.completion.chunk"
+    assert last["choices"][0]["finish_reason"] == ("length" if model == "mock-truncating" else "stop")
+    # One chunk per completion token, between the role chunk and the final one.
+    assert last["usage"]["completion_tokens"] == chunks - 2
+
+
+def test_error_injection(client, monkeypatch):
+    monkeypatch.setitem(mock_llm_server.OVERRIDES, "error_rate", 1.0)
+    for _ in range(10):
+        response = _complete(client, "mock-fast")
+        assert response.status_code in (429, 500, 503)
+        assert response.json()["error"]["code"] == response.status_code
+
+
+def test_max_tokens_truncates_with_length(client):
+    reply = _complete(client, "mock-fast", max_tokens=5).json()
+    assert reply["usage"]["completion_tokens"] == 5
+    assert reply["choices"][0]["finish_reason"] == "length"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_json_choices_when_response_format_asks(client, stream):
+    body = {
+        "messages": [{"role": "system", "content": CHOICE_PROMPT}] + MESSAGES[1:],
+        "response_format": TASK_PROFILES["choices"]["response_format"],
+    }
+    if stream:
+        content, _, _ = _stream(client, "mock-fast", **body)
+    else:
+        content = _complete(client, "mock-fast", **body).json()["choices"][0]["message"]["content"]
+
+    assert len(json.loads(content)["choices"]) == 4
+    assert parse_choices(content) == ["Stand your ground", "Seek a compromise", "Walk away", "Forge a new path"]
+
+
+def test_numbered_choices_without_response_format(client):
+    body = {"messages": [{"role": "system", "content": CHOICE_PROMPT}] + MESSAGES[1:]}
+    content = _complete(client, "mock-fast", **body).json()["choices"][0]["message"]["content"]
+    assert content.startswith("1. ")
+    assert len(parse_choices(content)) == 4
+
+
+def test_models_lists_every_profile(client):
+    assert [m["id"] for m in client.get("/v1/models").json()["data"]] == list(mock_llm_server.PROFILES)
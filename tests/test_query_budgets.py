@@ -0,0 +1,199 @@
+"""
+Per-rerun database budgets for every page and play phase.
+
+Each case renders app.py with Streamlit's AppTest, warms it up with one run,
+then records the statements issued by the next rerun. Cold cases record the
+first run with every cache and snapshot emptied, the journey case records
+each step of a dummy-model playthrough (the plays counter, the recorded
+journey), and the LLM case records the usage and rollup writes of one
+provider round trip. Going over a budget fails with a report of the call
+sites, so raise a budget only together with the change that earns it.
+
+DB time budgets are generous wall-clock limits for a local database; scale
+them with QUERY_BUDGET_TIME_SCALE on slower CI machines.
+"""
+import hashlib
+import uuid
+from types import SimpleNamespace
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from utils import llm, resilience
+
+ADMIN_PASSWORD = "query-budget-test"
+
+# page -> (max queries per rerun, max DB milliseconds per rerun)
+PAGE_BUDGETS = {
+    "How it Works": (0, 100),
+    "Archive": (0, 150),
+    "Propose New Choice": (0, 100),
+    "Curate (Admin)": (2, 200),
+    "Operations (Admin)": (1, 150),
+}
+ADMIN_PAGES = {"Propose New Choice", "Curate (Admin)", "Operations (Admin)"}
+
+# page -> (max queries, max DB milliseconds) for a first run with nothing cached
+COLD_PAGE_BUDGETS = {
+    "Play": (4, 250),
+    "How it Works": (3, 200),
+    "Archive": (4, 250),
+    "Propose New Choice": (3, 200),
+    "Curate (Admin)": (5, 300),
+    "Operations (Admin)": (4, 250),
+}
+
+# playthrough step -> (max queries, max DB milliseconds) for the run the step triggers
+JOURNEY_BUDGETS = {
+    "begin": (3, 150),  # applied-write marker, ops rollup, scenarios.plays
+    "turn": (0, 150),
+    "ready to choose": (0, 150),
+    "confirm choice": (0, 150),
+    "record": (8, 250),
+}
+
+# one call_llm round trip against a provider -> (max queries, max DB milliseconds)
+LLM_CALL_BUDGET = (6, 150)
+
+# play phase -> (max queries per rerun, max DB milliseconds per rerun)
+PLAY_BUDGETS = {
+    "setup": (0, 150),
+    "roleplay": (0, 150),
+    "choice": (0, 150),
+    "summary": (0, 150),
+    "recorded": (0, 150),
+}
+
+
+def _app(app_path, session_state) -> AppTest:
+    at = AppTest.from_file(app_path, default_timeout=30)
+    for key, value in session_state.items():
+        at.session_state[key] = value
+    return at
+
+
+def _rerun(at, query_recorder):
+    # Background revalidations a rerun starts are part of its cost.
+    queries = query_recorder.measure(lambda: (at.run(), resilience.wait_for_revalidation()))
+    assert not at.exception, [e.value for e in at.exception]
+    return queries
+
+
+def _click(at, label):
+    next(b for b in at.button if b.label == label).click()
+
+
+@pytest.fixture
+def cold_caches(monkeypatch, tmp_path):
+    """Call to empty Streamlit's query cache and every resilience snapshot, in memory and on disk."""
+    def empty():
+        st.cache_data.clear()
+        monkeypatch.setattr(resilience, "RESILIENCE_DIR", str(tmp_path))
+        monkeypatch.setattr(resilience, "_snapshots", {})
+        monkeypatch.setattr(resilience, "_invalidated", set())
+        monkeypatch.setattr(resilience, "_spooled", None)
+    return empty
+
+
+@pytest.fixture
+def admin_password(monkeypatch):
+    monkeypatch.setenv("ADMIN_PASSWORD_HASH", hashlib.sha256(ADMIN_PASSWORD.encode()).hexdigest())
+
+
+@pytest.fixture(scope="module")
+def scenario(database):
+    from sqlalchemy import text
+    with database.connect() as connection:
+        row = connection.execute(text("SELECT id, title FROM scenarios ORDER BY submitted_at LIMIT 1")).one_or_none()
+    if row is None:
+        pytest.skip("Test database has no scenarios")
+    return row
+
+
+@pytest.mark.parametrize("page", list(PAGE_BUDGETS))
+def test_page_query_budget(page, app_path, query_recorder, assert_query_budget, admin_password):
+    at = _app(app_path, {"current_page": page}).run()
+    if page in ADMIN_PAGES:
+        assert not at.exception, [e.value for e in at.exception]
+        next(w for w in at.text_input if w.label == "Admin Password").input(ADMIN_PASSWORD)
+        at.run()
+    assert not at.exception, [e.value for e in at.exception]
+
+    assert_query_budget(page, _rerun(at, query_recorder), PAGE_BUDGETS[page])
+
+
+@pytest.mark.parametrize("phase", list(PLAY_BUDGETS))
+def test_play_phase_query_budget(phase, app_path, query_recorder, assert_query_budget, scenario):
+    state = {
+        "current_page": "Play",
+        "play_phase": phase,
+        "current_model": "dummy",
+        "pseudonym": "Budget Tester",
+    }
+    if phase != "setup":
+        state.update({
+            "current_scenario": scenario.title,
+            "current_scenario_id": str(scenario.id),
+            "journey_id": str(uuid.uuid4()),
+            "messages": [
+                {"role": "system", "content": "You are running a test scenario."},
+                {"role": "assistant", "content": "The story begins."},
+            ],
+            "final_choice": "Walk away",
+            "edited_summary": "A short reflection.",
+        })
+    at = _app(app_path, state).run()
+    assert not at.exception, [e.value for e in at.exception]
+
+    assert_query_budget(f"Play ({phase})", _rerun(at, query_recorder), PLAY_BUDGETS[phase])
+
+
+@pytest.mark.parametrize("page", list(COLD_PAGE_BUDGETS))
+def test_page_cold_query_budget(page, app_path, query_recorder, assert_query_budget, admin_password, cold_caches):
+    at = _app(app_path, {"current_page": page, "pseudonym": "Budget Tester"})
+    if page in ADMIN_PAGES:
+        at.run()
+        assert not at.exception, [e.value for e in at.exception]
+        next(w for w in at.text_input if w.label == "Admin Password").input(ADMIN_PASSWORD)
+    cold_caches()
+
+    assert_query_budget(f"{page} (cold)", _rerun(at, query_recorder), COLD_PAGE_BUDGETS[page])
+
+
+def test_journey_query_budget(app_path, query_recorder, assert_query_budget):
+    at = _app(app_path, {"current_page": "Play", "pseudonym": "Budget Tester"}).run()
+    assert not at.exception, [e.value for e in at.exception]
+    at.selectbox(key="play_model").set_value("Dummy LLM (No Cost)")
+    at.run()
+
+    steps = {
+        "begin": lambda: _click(at, "🚀 Begin Your Journey"),
+        "turn": lambda: at.chat_input[0].set_value("I look around carefully."),
+        "ready to choose": lambda: _click(at, "🗳️ I have seen enough. I am ready to choose."),
+        "confirm choice": lambda: _click(at, "Confirm Choice"),
+        "record": lambda: _click(at, "Record This Choice"),
+    }
+    for step, action in steps.items():
+        action()
+        assert_query_budget(f"Journey ({step})", _rerun(at, query_recorder), JOURNEY_BUDGETS[step])
+    assert at.session_state.play_phase == "recorded"
+    assert not at.session_state.journey_queued
+
+
+def test_llm_call_query_budget(query_recorder, assert_query_budget, scenario, monkeypatch):
+    response = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=120, completion_tokens=40),
+        choices=[SimpleNamespace(message=SimpleNamespace(content="The story continues."), finish_reason="stop")],
+    )
+
+    def complete(model, on_response=None, **kwargs):
+        on_response("budget-test-backend", response)
+        return response, "budget-test-backend"
+
+    monkeypatch.setattr(llm.router, "complete", complete)
+    messages = [{"role": "user", "content": "I open the door."}]
+    call = lambda: llm.call_llm("gemini-flash", messages, journey_id=str(uuid.uuid4()), scenario=str(scenario.id), rate_limit=False)
+    call()  # warm the budget snapshot, as every call after a player's first finds it
+
+    assert_query_budget("call_llm round trip", query_recorder.measure(call), LLM_CALL_BUDGET)
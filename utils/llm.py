@@ -1,35 +1,157 @@
-from litellm import completion
+import json
+import logging
+import time
+from litellm import completion_cost
 import streamlit as st
-from utils.services import get_setting, increment_usage
+import utils.services as services
+from utils import ratelimit, router
 
-def call_llm(model: str, messages: list, system_prompt: str = None) -> str:
+log = logging.getLogger(__name__)
+
+# Generation settings per task. Any key besides "tier" is passed to litellm.completion;
+# "tier": "fast" sends the task to the cheaper pool in router.FAST_TIER.
+TASK_PROFILES = {
+    "roleplay": {"max_tokens": 1200, "temperature": 0.8, "stop": ["\nUser:", "\nPlayer:"]},
+    "choices": {
+        "max_tokens": 250, "temperature": 0.7, "tier": "fast",
+        "response_format": {"type": "json_object"},
+    },
+    "summary": {"max_tokens": 450, "temperature": 0.4, "tier": "fast"},
+    # A simulated player's next line, for evaluate_scenarios.py
+    "persona": {"max_tokens": 150, "temperature": 1.0, "tier": "fast"},
+}
+
+DUMMY_CHOICES = ["Stand your ground", "Seek a compromise", "Walk away", "Forge a new path"]
+
+# Prepended to every scenario's prompt for the roleplay.
+PLAY_STYLE_PROMPT = """
+CRITICAL INTERACTION STYLE:
+- Never present A/B/C/D options
+- Never list "you could do X, Y, or Z"
+- Ask open questions and let the user respond freely
+- React to what they actually say/do
+- If they're uncertain, ask clarifying questions
+- Draw out their reasoning through dialogue
+- Let choices emerge from conversation, not menu selection
+
+Example:
+WRONG: "What do you do? A) Tell them B) Hide it C) Run away"
+RIGHT: "The parrot is still talking. What do you do?" 
+       [User responds naturally, you react to their specific choice]
+Also add:
+PACING:
+- Keep responses short (2-4 sentences usually)
+- Present one moment/beat at a time
+- Wait for user response before continuing
+- Don't rush through the scenario
+- Let tension build naturally
+- Allow pauses and uncertainty
+- Don't present options, except if characters do
+"""
+
+CHOICE_PROMPT = """
+Based on the conversation so far, generate 4 concrete, distinct choices the protagonist now faces.
+Keep each under 25 words.
+Reply with JSON only, in the form {"choices": ["...", "...", "...", "..."]} — no commentary or continuation.
+"""
+
+SUMMARY_PROMPT = """
+Summarize the entire story journey in 150–250 words from a neutral third-person perspective.
+Include key events, internal conflicts, and end with the final choice: "{final_choice}".
+Focus on the ethical dimensions and emotional weight.
+"""
+
+def parse_choices(text: str) -> list:
+    """Choice strings from a {"choices": [...]} reply, falling back to a numbered list."""
+    try:
+        data = json.loads(text.strip().removeprefix("```json").strip("`"))
+        items = data.get("choices") if isinstance(data, dict) else data
+        if isinstance(items, list):
+            choices = [str(item).strip() for item in items if str(item).strip()]
+            if choices:
+                return choices[:4]
+    except ValueError:
+        pass
+
+    choices = []
+    choice_lines = [line.strip() for line in text.split("\n") if line.strip() and (line[0].isdigit() or "." in line[:3])]
+    for line in choice_lines[:4]:
+        if ". " in line:
+            choices.append(line.split(". ", 1)[1])
+        elif ":" in line:
+            choices.append(line.split(":", 1)[1].strip())
+        else:
+            choices.append(line)
+    return choices
+
+def usage_from_response(response):
+    """Prompt tokens, completion tokens and USD cost reported for a LiteLLM response."""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    try:
+        cost = completion_cost(completion_response=response) or 0.0
+    except Exception:
+        # Models missing from LiteLLM's price map (local mocks, previews) are counted by tokens only.
+        cost = 0.0
+    return prompt_tokens, completion_tokens, cost
+
+def _record_call(scenario, model, started, ok):
+    try:
+        services.record_llm_call(scenario, model, round((time.monotonic() - started) * 1000), ok)
+    except Exception:
+        pass  # monitoring must never cost the player their response
+
+def _on_response(backend, response, journey_id, callback):
+    try:
+        services.record_llm_usage(backend, journey_id, *usage_from_response(response))
+    except Exception:
+        # The reply is paid for either way; losing it too would only make matters worse.
+        log.warning("Could not record LLM usage for %s (journey %s)", backend, journey_id, exc_info=True)
+    if callback:
+        callback(backend, response)
+
+def call_llm(model: str, messages: list, system_prompt: str = None, journey_id: str = None, scenario: str = None,
+             task: str = "roleplay", rate_limit: bool = True, on_response=None) -> str:
+    """
+    Runs one `task` turn against `model`'s backend pool. Outside a Streamlit session (batch tools),
+    pass rate_limit=False to skip the per-visitor buckets and `on_response(backend, response)` to
+    see each provider response; usage is recorded and the daily budget enforced either way.
+    """
     if model == "dummy":
-        if system_prompt:
-            if "generate 4" in system_prompt:
-                return "1. Stand your ground\n2. Seek a compromise\n3. Walk away\n4. Forge a new path"
-            if "Summarize" in system_prompt:
-                return f"A journey was undertaken, patterns were observed, and a choice was made: {st.session_state.get('final_choice', 'Unknown')}. The archive grows by one reflection, a drop in the digital ocean of moral uncertainty."
+        if task == "choices":
+            return json.dumps({"choices": DUMMY_CHOICES})
+        if task == "summary":
+            return f"A journey was undertaken, patterns were observed, and a choice was made: {st.session_state.get('final_choice', 'Unknown')}. The archive grows by one reflection, a drop in the digital ocean of moral uncertainty."
+        if task == "persona":
+            return "I hesitate, then say what I honestly think."
         return "The machine mind process follows a logic you cannot yet perceive. The story continues."
 
-    limit = int(get_setting("daily_limit", "150"))
-    if int(get_setting("current_count", "0")) >= limit: # Double check usage directly to avoid circular reset if needed, but services.get_usage() is safer usually.
-        # However, to avoid circular imports if services uses llm, we should be careful.
-        # Actually, services doesn't use llm. llm uses services.
-        pass
+    # Cheapest rejection first: no DB or provider work for clients over their rate.
+    if rate_limit:
+        ratelimit.check(*ratelimit.current_identity())
 
-    import utils.services as services
-    if services.get_usage() >= limit:
+    if services.budget_exhausted():
         return "The collective capacity for difficult choices has been exhausted today. Return tomorrow."
 
+    params = dict(TASK_PROFILES[task])
+    model = router.model_for_tier(model, params.pop("tier", None))
+    started = time.monotonic()
     try:
-        services.increment_usage()
         full_messages = [{"role": "system", "content": system_prompt}] + messages if system_prompt else messages
-        response = completion(model=model, messages=full_messages, max_tokens=1200, temperature=0.8)
-        
+        response, _ = router.complete(
+            model,
+            messages=full_messages, **params,
+            on_response=lambda backend, response: _on_response(backend, response, journey_id, on_response)
+        )
+        _record_call(scenario, model, started, ok=True)
+
         content = response.choices[0].message.content
-        if response.choices[0].finish_reason == "length":
+        # A note would break structured output; the parser copes with a cut-off reply instead.
+        if response.choices[0].finish_reason == "length" and "response_format" not in params:
             content += "\n\n*(Note: This response was truncated due to length limits.)*"
-            
+
         return content
     except Exception as e:
+        _record_call(scenario, model, started, ok=False)
         return f"Temporal anomaly: {str(e)}"
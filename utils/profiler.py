@@ -0,0 +1,232 @@
+"""
+On-demand sampling profiler for one Streamlit session.
+
+An admin starts it for their own session's next N script runs; every rerun
+and fragment execution counts as one. A single sampler thread, alive only
+while some session is being profiled, reads the stacks of that session's
+script threads via sys._current_frames every SAMPLE_INTERVAL seconds. Other
+sessions' threads are never sampled, and no code is traced, so the cost to
+everyone else is one thread briefly taking the GIL a hundred times a second.
+A profile whose runs don't all arrive (say the admin closed the tab) ends
+after MAX_PROFILE_SECONDS, so the sampler can't outlive it.
+
+Each sample is classified by its innermost database or LLM frame: "db" while
+waiting on Postgres (SQLAlchemy/psycopg2), "llm" while waiting on a provider
+(utils/router.py, LiteLLM, httpx), otherwise "cpu". The category becomes the
+root frame of the folded stacks (`a;b;c count`), so flame graph tools such as
+flamegraph.pl or speedscope show database and LLM wait as separate towers.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+
+SAMPLE_INTERVAL = 0.01
+MAX_RUNS = 50
+MAX_PROFILE_SECONDS = 300
+MAX_KEPT_PROFILES = 20      # finished profiles kept in memory, oldest dropped first
+SCRIPT_THREAD_NAME = "ScriptRunner.scriptThread"
+
+REPO_ROOT = str(Path(__file__).resolve().parent.parent) + os.sep
+DB_MARKERS = (f"{os.sep}sqlalchemy{os.sep}", f"{os.sep}psycopg2{os.sep}", f"{os.sep}pandas{os.sep}io{os.sep}sql.py")
+LLM_MARKERS = (f"{os.sep}litellm{os.sep}", f"{os.sep}httpx{os.sep}", f"{os.sep}httpcore{os.sep}", f"{os.sep}openai{os.sep}",
+               f"utils{os.sep}router.py")
+
+
+class Profile:
+    def __init__(self, runs: int, skip_run):
+        self.runs_wanted = runs
+        self.skip_run = skip_run        # the run that started the profile isn't one of "the next N"
+        self.started = time.time()
+        self.stacks = Counter()         # folded stack -> samples
+        self.seconds = Counter()        # category -> sampled seconds
+        self.runs = []                  # finished runs, oldest first
+        self.active = {}                # script thread -> run in progress
+        self.done = False
+        self.expired = False            # ended by MAX_PROFILE_SECONDS rather than by its runs
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_frames(self, limit: int = 25) -> list:
+        """Functions by samples spent in them or below (inclusive), split by category."""
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            category, *frames = stack.split(";")
+            for frame in set(frames):
+                inclusive[(frame, category)] += count
+        return [
+            {"function": frame, "category": category, "ms": round(count * SAMPLE_INTERVAL * 1000)}
+            for (frame, category), count in inclusive.most_common(limit)
+        ]
+
+
+_profiles = OrderedDict()  # session id -> Profile (running or finished)
+_lock = threading.Lock()
+_sampler = None
+
+
+def _label(frame) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(REPO_ROOT):
+        filename = filename[len(REPO_ROOT):]
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    else:
+        filename = os.path.join(*Path(filename).parts[-2:])
+    return f"{filename}:{frame.f_code.co_name}"
+
+
+def _fold(frame):
+    """(category, folded frames) for one thread's stack, starting from the app's own code."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()  # outermost first
+    first = next((i for i, f in enumerate(frames) if f.f_code.co_filename.startswith(REPO_ROOT)), None)
+    if first is None:
+        return "cpu", "[streamlit]"
+    category = "cpu"
+    for f in reversed(frames[first:]):
+        filename = f.f_code.co_filename
+        if any(marker in filename for marker in DB_MARKERS):
+            category = "db"
+            break
+        if any(marker in filename for marker in LLM_MARKERS):
+            category = "llm"
+            break
+    return category, ";".join(_label(f) for f in frames[first:])
+
+
+def _entry_point(stack: str) -> str:
+    """The page or fragment function a run spent its time in, e.g. `utils/ui.py:render_archive_page`."""
+    frames = stack.split(";")
+    return frames[1] if len(frames) > 1 and frames[0] == "app.py:<module>" else frames[0]
+
+
+def _finish(profile: Profile, thread):
+    run = profile.active.pop(thread)
+    profile.runs.append({
+        "kind": run["kind"],
+        "entry": next((entry for entry, _ in run["entry"].most_common() if entry != "[streamlit]"), "[streamlit]"),
+        "wall_ms": round((time.time() - run["started"]) * 1000),
+        **{f"{category}_ms": round(run["seconds"][category] * 1000) for category in ("cpu", "db", "llm")},
+    })
+
+
+def _sample(profile: Profile, threads: list, frames: dict, elapsed: float):
+    alive = set()
+    for thread, ctx in threads:
+        # ScriptRunContext.reset() gives every run (rerun or fragment) a fresh `cursors` dict,
+        # which tells runs apart even when one script thread handles several in a row.
+        marker = ctx.cursors
+        if marker is profile.skip_run or thread.ident not in frames:
+            continue
+        run = profile.active.get(thread)
+        if run is not None and run["marker"] is not marker:
+            _finish(profile, thread)
+            run = None
+        if run is None:
+            if len(profile.runs) + len(profile.active) >= profile.runs_wanted:
+                continue
+            run = profile.active[thread] = {
+                "marker": marker,
+                "kind": "fragment" if ctx.fragment_ids_this_run else "rerun",
+                "started": time.time(),
+                "seconds": Counter(),
+                "entry": Counter(),
+            }
+        alive.add(thread)
+        category, stack = _fold(frames[thread.ident])
+        profile.stacks[f"{category};{stack}"] += 1
+        profile.seconds[category] += elapsed
+        run["seconds"][category] += elapsed
+        run["entry"][_entry_point(stack)] += 1
+
+    for thread in [t for t in profile.active if t not in alive]:
+        _finish(profile, thread)
+    if len(profile.runs) >= profile.runs_wanted and not profile.active:
+        profile.done = True
+
+
+def _expire(profile: Profile):
+    for thread in list(profile.active):
+        _finish(profile, thread)
+    profile.done = profile.expired = True
+
+
+def _sample_loop():
+    global _sampler
+    last = time.monotonic()
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        now = time.monotonic()
+        elapsed, last = now - last, now
+        with _lock:
+            for profile in _profiles.values():
+                if not profile.done and time.time() - profile.started > MAX_PROFILE_SECONDS:
+                    _expire(profile)
+            profiling = {sid: p for sid, p in _profiles.items() if not p.done}
+            if not profiling:
+                _sampler = None
+                return
+        frames = sys._current_frames()
+        by_session = {}
+        for thread in threading.enumerate():
+            if thread.name != SCRIPT_THREAD_NAME:
+                continue
+            ctx = getattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+            if ctx is not None and ctx.session_id in profiling:
+                by_session.setdefault(ctx.session_id, []).append((thread, ctx))
+        with _lock:
+            for session_id, profile in profiling.items():
+                _sample(profile, by_session.get(session_id, []), frames, elapsed)
+        del frames  # don't keep other threads' frames alive between samples
+
+
+def start(runs: int):
+    """Profiles the calling session's next `runs` reruns and fragment executions."""
+    global _sampler
+    ctx = get_script_run_ctx()
+    with _lock:
+        _profiles.pop(ctx.session_id, None)
+        _profiles[ctx.session_id] = Profile(min(max(runs, 1), MAX_RUNS), ctx.cursors)
+        while len(_profiles) > MAX_KEPT_PROFILES:
+            _profiles.popitem(last=False)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="session-profiler", daemon=True)
+            _sampler.start()
+
+
+def stop():
+    """Ends the calling session's profile early, keeping what was captured."""
+    with _lock:
+        profile = _profiles.get(get_script_run_ctx().session_id)
+        if profile is not None:
+            profile.done = True
+
+
+def current():
+    """
+    A copy of the calling session's latest profile (running or finished), or None:
+    {"runs_wanted", "done", "expired", "seconds", "runs", "top_frames", "folded"}.
+    """
+    with _lock:
+        profile = _profiles.get(get_script_run_ctx().session_id)
+        if profile is None:
+            return None
+        return {
+            "runs_wanted": profile.runs_wanted,
+            "done": profile.done,
+            "expired": profile.expired,
+            "seconds": dict(profile.seconds),
+            "runs": list(profile.runs),
+            "top_frames": profile.top_frames(),
+            "folded": profile.folded(),
+        }
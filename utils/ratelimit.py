@@ -0,0 +1,164 @@
+"""
+Per-session and per-client token buckets checked before any LLM work.
+
+The in-memory backend is per process. Multi-replica deployments can set
+RATE_LIMIT_BACKEND=postgres to share buckets through the rate_limit_buckets
+table, serialised per key with transaction-scoped advisory locks. About one
+call in PRUNE_ONE_IN also deletes the rows that have refilled to capacity.
+
+Clients are told apart by the peer address, or by TRUSTED_PROXY_HEADER when a
+proxy in front of the app overwrites that header (X-Real-IP behind the nginx
+in docker-compose.yaml, Fly-Client-IP on Fly.io). Without a trusted proxy,
+forwarded headers are ignored: clients can set them to anything.
+"""
+import math
+import os
+import random
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.db import conn
+
+# (capacity, tokens refilled per second)
+RATE_LIMITS = {
+    "session": (6, 1 / 10),
+    "client": (20, 1 / 3),
+}
+
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+MAX_MEMORY_BUCKETS = 10_000
+PRUNE_ONE_IN = 100
+TRUSTED_PROXY_HEADER = os.getenv("TRUSTED_PROXY_HEADER", "")
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Rate limit exceeded, retry in {self.retry_after}s")
+
+
+def _refill(tokens: float, elapsed: float, capacity: int, rate: float) -> float:
+    return min(capacity, tokens + elapsed * rate)
+
+
+def _wait_for_token(tokens: float, rate: float) -> float:
+    return 0.0 if tokens >= 1 else (1 - tokens) / rate
+
+
+# --- In-memory backend ---
+_buckets = {}  # key -> (tokens, last_refill_monotonic)
+_lock = threading.Lock()
+
+
+def _evict(now):
+    """
+    Drops buckets that have refilled to capacity, which changes nothing. If that isn't
+    enough, the fullest go next, so clients being throttled are the last to be forgotten.
+    """
+    fullness = {}
+    for key, (tokens, last) in list(_buckets.items()):
+        capacity, rate = RATE_LIMITS[key.split(":", 1)[0]]
+        fullness[key] = _refill(tokens, now - last, capacity, rate) / capacity
+        if fullness[key] >= 1:
+            del _buckets[key]
+    excess = len(_buckets) - MAX_MEMORY_BUCKETS * 9 // 10
+    if excess > 0:
+        for key in sorted(_buckets, key=lambda key: (-fullness[key], _buckets[key][1]))[:excess]:
+            del _buckets[key]
+
+
+def _take_memory(limits):
+    now = time.monotonic()
+    with _lock:
+        refilled = {}
+        for key, (capacity, rate) in limits.items():
+            tokens, last = _buckets.get(key, (capacity, now))
+            refilled[key] = _refill(tokens, now - last, capacity, rate)
+
+        wait = max(_wait_for_token(refilled[key], rate) for key, (_, rate) in limits.items())
+        if wait > 0:
+            return wait
+
+        if len(_buckets) >= MAX_MEMORY_BUCKETS:
+            _evict(now)
+        for key, tokens in refilled.items():
+            _buckets[key] = (tokens - 1, now)
+        return 0.0
+
+
+# --- Shared Postgres backend ---
+def _take_postgres(limits):
+    keys = sorted(limits)  # fixed lock order avoids deadlocks between replicas
+    with conn._instance.begin() as connection:
+        for key in keys:
+            connection.exec_driver_sql("SELECT pg_advisory_xact_lock(hashtext(%s))", (key,))
+        rows = connection.exec_driver_sql(
+            "SELECT key, tokens, EXTRACT(EPOCH FROM NOW() - updated_at) "
+            "FROM rate_limit_buckets WHERE key = ANY(%s)",
+            (keys,)
+        ).fetchall()
+        stored = {key: (tokens, float(elapsed)) for key, tokens, elapsed in rows}
+
+        refilled = {}
+        for key, (capacity, rate) in limits.items():
+            tokens, elapsed = stored.get(key, (capacity, 0.0))
+            refilled[key] = _refill(tokens, elapsed, capacity, rate)
+
+        wait = max(_wait_for_token(refilled[key], rate) for key, (_, rate) in limits.items())
+        if wait > 0:
+            return wait
+
+        for key in keys:
+            connection.exec_driver_sql(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (%s, %s, NOW()) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = EXCLUDED.tokens, updated_at = EXCLUDED.updated_at",
+                (key, refilled[key] - 1)
+            )
+    if random.randrange(PRUNE_ONE_IN) == 0:
+        prune_postgres_buckets()  # in its own transaction, after the advisory locks are released
+    return 0.0
+
+
+def prune_postgres_buckets() -> int:
+    """
+    Deletes rate_limit_buckets rows idle long enough to have refilled to capacity, which a
+    missing row also means; every session leaves one behind. Returns how many went.
+    """
+    deleted = 0
+    with conn._instance.begin() as connection:
+        for kind, (capacity, rate) in RATE_LIMITS.items():
+            deleted += connection.exec_driver_sql(
+                "DELETE FROM rate_limit_buckets WHERE key LIKE %s AND updated_at < NOW() - make_interval(secs => %s)",
+                (f"{kind}:%", capacity / rate)
+            ).rowcount
+    return deleted
+
+
+def current_identity():
+    """(session key, client key) for the running Streamlit session."""
+    ctx = get_script_run_ctx()
+    session_id = ctx.session_id if ctx else "local"
+    client = "unknown"
+    try:
+        if TRUSTED_PROXY_HEADER:
+            client = st.context.headers.get(TRUSTED_PROXY_HEADER, "").split(",")[0].strip() or client
+        else:
+            client = st.context.ip_address or client
+    except Exception:
+        pass
+    return session_id, client
+
+
+def check(session_key: str, client_key: str):
+    """Takes one token from both buckets, or raises RateLimitExceeded without taking any."""
+    limits = {
+        f"session:{session_key}": RATE_LIMITS["session"],
+        f"client:{client_key}": RATE_LIMITS["client"],
+    }
+    take = _take_postgres if BACKEND == "postgres" else _take_memory
+    wait = take(limits)
+    if wait > 0:
+        raise RateLimitExceeded(wait)
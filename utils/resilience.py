@@ -0,0 +1,382 @@
+"""
+Degraded mode for when Postgres is slow or unavailable.
+
+Reads go through `read(key, loader, fresh_for)`. The last good result of each
+loader is kept in memory and on disk under RESILIENCE_DIR. A copy younger than
+`fresh_for` is served without touching Postgres; an older one is served at
+once while a background thread revalidates it. If Postgres can't answer, the
+last good copy is served however old it is, including one left on disk by a
+previous process.
+
+A circuit breaker counts connection errors, timeouts and calls slower than
+SLOW_CALL_SECONDS. After FAILURE_THRESHOLD in a row it opens: for
+COOLDOWN_SECONDS nothing is sent to Postgres, then one call probes whether it
+is back.
+
+Writes go through `write(statements)`. When Postgres is unavailable they are
+appended to a SQLite spool instead and replayed in order, each batch in one
+transaction, once it answers again. Every batch carries an id that is recorded
+in applied_writes in the same transaction, so a batch is applied once even if
+the acknowledgement of its first commit was lost and it got spooled anyway.
+Processes sharing a spool take turns replaying it under a file lock.
+Applied ids are kept for APPLIED_RETENTION_DAYS; a batch spooled for longer
+than that could be applied twice.
+"""
+import fcntl
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+from utils.db import NothingWritten, execute_writes
+
+RESILIENCE_DIR = os.getenv("RESILIENCE_DIR", "./.resilience")
+SLOW_CALL_SECONDS = 2.0
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 30
+REPLAY_INTERVAL_SECONDS = 15
+MAX_REPLAY_ATTEMPTS = 5
+APPLIED_RETENTION_DAYS = 30
+
+
+class DatabaseUnavailable(Exception):
+    """Postgres can't be reached (or the breaker is open) and there is nothing to fall back on."""
+
+
+# Errors meaning "the database didn't answer"; anything else is a bug or bad data and propagates.
+UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError, DatabaseUnavailable)
+
+
+class CircuitBreaker:
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < COOLDOWN_SECONDS:
+                return False
+            self.probing = True  # half-open: this call decides
+            return True
+
+    def record(self, ok: bool):
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= FAILURE_THRESHOLD or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+
+breaker = CircuitBreaker()
+
+
+def call(fn):
+    """`fn()`, a unit of database work, run through the breaker."""
+    if not breaker.allow():
+        raise DatabaseUnavailable("database circuit open")
+    started = time.monotonic()
+    try:
+        result = fn()
+    except UNAVAILABLE_ERRORS:
+        breaker.record(False)
+        raise
+    except Exception:
+        breaker.record(True)  # the database answered; the statement was at fault
+        raise
+    breaker.record(time.monotonic() - started < SLOW_CALL_SECONDS)
+    return result
+
+
+def degraded() -> bool:
+    return breaker.is_open
+
+
+# --- Snapshots ---
+_snapshots = {}  # key -> (saved_at, pickled value); pickled so every reader gets its own copy
+_invalidated = set()
+_revalidating = set()
+_snapshot_lock = threading.Lock()
+
+
+def _snapshot_path(key: str) -> str:
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+    return os.path.join(RESILIENCE_DIR, "snapshots", f"{name}.pickle")
+
+
+def _get_snapshot(key: str):
+    with _snapshot_lock:
+        if key in _snapshots:
+            return _snapshots[key]
+    try:
+        with open(_snapshot_path(key), "rb") as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    with _snapshot_lock:
+        return _snapshots.setdefault(key, snapshot)
+
+
+def _store(key: str, value):
+    snapshot = (time.time(), pickle.dumps(value))
+    with _snapshot_lock:
+        _snapshots[key] = snapshot
+        _invalidated.discard(key)
+    path = _snapshot_path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(snapshot, f)
+        os.replace(tmp, path)  # readers in other processes never see half a file
+    except OSError:
+        pass  # the in-memory copy still serves this process
+
+
+def _load(key: str, loader):
+    value = call(loader)
+    _store(key, value)
+    return value
+
+
+def _revalidate(key: str, loader):
+    with _snapshot_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def run():
+        try:
+            _load(key, loader)
+        except Exception:
+            pass  # keep serving the old copy; the breaker has counted the failure
+        finally:
+            with _snapshot_lock:
+                _revalidating.discard(key)
+
+    thread = threading.Thread(target=run, name=f"revalidate-{key}", daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+
+
+def read(key: str, loader, fresh_for: float):
+    """
+    `loader()`'s result, served from the snapshot under `key` while it is younger than
+    `fresh_for` seconds or Postgres can't answer. Raises DatabaseUnavailable if there is
+    no snapshot to fall back on.
+    """
+    _ensure_replayer()
+    snapshot = _get_snapshot(key)
+    if snapshot is not None:
+        saved_at, blob = snapshot
+        with _snapshot_lock:
+            invalidated = key in _invalidated
+        if not invalidated and time.time() - saved_at < fresh_for:
+            return pickle.loads(blob)
+        if not invalidated or breaker.is_open:
+            _revalidate(key, loader)  # with the breaker open, this is its probe once the cooldown is over
+            return pickle.loads(blob)
+    try:
+        return _load(key, loader)
+    except UNAVAILABLE_ERRORS as e:
+        if snapshot is not None:
+            return pickle.loads(snapshot[1])
+        raise DatabaseUnavailable(str(e)) from e
+
+
+def invalidate(key: str):
+    """After a write from this process: the next read of `key` waits for Postgres rather than serving the old copy."""
+    with _snapshot_lock:
+        _invalidated.add(key)
+
+
+def wait_for_revalidation(timeout: float = 10.0):
+    """Blocks until background revalidations have finished, e.g. to measure a rerun's queries."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with _snapshot_lock:
+            if not _revalidating:
+                return
+        time.sleep(0.01)
+
+
+# --- Write spool ---
+_spool_lock = threading.Lock()
+_spooled = None  # live entries in the spool, counted from the file once, then kept by write() and replay()
+_replayer = None
+
+
+def _spool():
+    os.makedirs(RESILIENCE_DIR, exist_ok=True)
+    db = sqlite3.connect(os.path.join(RESILIENCE_DIR, "spool.sqlite3"), timeout=30)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS spool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            statements BLOB NOT NULL,
+            queued_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            dead INTEGER NOT NULL DEFAULT 0,
+            batch_id TEXT
+        )
+    """)
+    if "batch_id" not in [column[1] for column in db.execute("PRAGMA table_info(spool)")]:
+        db.execute("ALTER TABLE spool ADD COLUMN batch_id TEXT")  # a spool from before batch ids
+    return db
+
+
+def _apply(batch_id: str, statements) -> bool:
+    """Runs the batch in one transaction unless it has been applied before; returns False if it had."""
+    marker = ("INSERT INTO applied_writes (batch_id) VALUES (%s) ON CONFLICT DO NOTHING", (batch_id,))
+    try:
+        call(lambda: execute_writes([marker] + list(statements), required={0}))
+        return True
+    except NothingWritten:
+        return False
+
+
+def _count_spool() -> int:
+    """Recounts the spool file, which other processes may have added to; call with _spool_lock held."""
+    global _spooled
+    db = _spool()
+    try:
+        _spooled = db.execute("SELECT COUNT(*) FROM spool WHERE NOT dead").fetchone()[0]
+    finally:
+        db.close()
+    return _spooled
+
+
+def spooled_count() -> int:
+    """Writes waiting for Postgres (entries given up on as dead aren't counted)."""
+    with _spool_lock:
+        return _count_spool() if _spooled is None else _spooled
+
+
+def write(statements) -> bool:
+    """
+    execute_writes(statements), or queue them for replay if Postgres is unavailable.
+    Returns False if queued. Errors from a database that did answer propagate as usual.
+    """
+    global _spooled
+    _ensure_replayer()
+    batch_id = str(uuid.uuid4())
+    try:
+        if spooled_count():
+            raise DatabaseUnavailable("earlier writes are still queued")  # keep writes in order
+        _apply(batch_id, statements)
+        return True
+    except UNAVAILABLE_ERRORS as e:
+        with _spool_lock:
+            if _spooled is None:
+                _count_spool()
+            db = _spool()
+            try:
+                with db:
+                    db.execute(
+                        "INSERT INTO spool (statements, queued_at, last_error, batch_id) VALUES (?, ?, ?, ?)",
+                        (pickle.dumps(list(statements)), time.time(), str(e)[:500], batch_id)
+                    )
+            finally:
+                db.close()
+            _spooled += 1
+        return False
+
+
+def replay() -> int:
+    """
+    Writes queued batches to Postgres, oldest first, and returns how many went through
+    (batches found already applied included). Stops while Postgres is unavailable; a batch
+    it rejects MAX_REPLAY_ATTEMPTS times is marked dead and left in the spool for inspection.
+    Returns 0 at once if another thread or process is replaying the spool.
+    """
+    global _spooled
+    written = 0
+    os.makedirs(RESILIENCE_DIR, exist_ok=True)
+    # The file lock serialises replayers; _spool_lock is only held for spool reads and
+    # updates, so writes queue up behind no Postgres round trip.
+    with open(os.path.join(RESILIENCE_DIR, "spool.replay.lock"), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)  # released when the file closes
+        except BlockingIOError:
+            return 0
+        db = _spool()
+        try:
+            with _spool_lock:
+                entries = db.execute(
+                    "SELECT id, statements, attempts, COALESCE(batch_id, 'spool-' || id || '-' || queued_at) "
+                    "FROM spool WHERE NOT dead ORDER BY id"
+                ).fetchall()
+            for entry_id, blob, attempts, batch_id in entries:
+                try:
+                    _apply(batch_id, pickle.loads(blob))
+                except UNAVAILABLE_ERRORS as e:
+                    if not isinstance(e, DatabaseUnavailable):
+                        with _spool_lock, db:
+                            db.execute("UPDATE spool SET attempts = attempts + 1, last_error = ? WHERE id = ?", (str(e)[:500], entry_id))
+                    break
+                except Exception as e:
+                    dead = attempts + 1 >= MAX_REPLAY_ATTEMPTS
+                    with _spool_lock:
+                        with db:
+                            db.execute(
+                                "UPDATE spool SET attempts = attempts + 1, last_error = ?, dead = ? WHERE id = ?",
+                                (str(e)[:500], dead, entry_id)
+                            )
+                        if dead and _spooled:
+                            _spooled -= 1
+                    continue
+                with _spool_lock:
+                    with db:
+                        db.execute("DELETE FROM spool WHERE id = ?", (entry_id,))
+                    if _spooled:
+                        _spooled -= 1
+                written += 1
+        finally:
+            db.close()
+    return written
+
+
+def _ensure_replayer():
+    """Starts this process's replay thread, which drains the spool left by this or an earlier process."""
+    global _replayer
+    if _replayer is not None:
+        return
+
+    def loop():
+        pruned_at = 0
+        while True:
+            time.sleep(REPLAY_INTERVAL_SECONDS)
+            try:
+                with _spool_lock:
+                    pending = _count_spool()  # picks up entries spooled by other processes
+                if pending:
+                    replay()
+                if time.monotonic() - pruned_at > 3600:
+                    call(lambda: execute_writes([(
+                        "DELETE FROM applied_writes WHERE applied_at < NOW() - make_interval(days => %s)",
+                        (APPLIED_RETENTION_DAYS,)
+                    )]))
+                    pruned_at = time.monotonic()
+            except Exception:
+                pass  # e.g. the spool file is briefly locked; try again next round
+
+    with _snapshot_lock:
+        if _replayer is None:
+            _replayer = threading.Thread(target=loop, name="spool-replay", daemon=True)
+            _replayer.start()
@@ -0,0 +1,195 @@
+"""
+Latency-aware routing of each logical "AI Mind" over a pool of LiteLLM backends.
+
+Every backend keeps a rolling window of call latencies and outcomes. Calls go
+to the healthiest backend first; if it has not answered by its own p95 latency
+a hedge request is sent to the next one, and errors fail over down the pool.
+The first successful answer wins.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from litellm import completion
+
+# Logical model id (the values of ui.MODEL_OPTIONS) -> ordered backends.
+# Extra keys besides "model" are passed straight to litellm.completion.
+MODEL_POOLS = {
+    "gemini-flash": [
+        {"model": "gemini/gemini-3-flash-preview"},
+        {"model": "gemini/gemini-2.5-flash"},
+    ],
+    "gemini-flash-lite": [
+        {"model": "gemini/gemini-2.5-flash-lite"},
+        {"model": "gemini/gemini-2.0-flash-lite"},
+    ],
+}
+
+# Cheaper, faster pool per logical model for auxiliary tasks (choice lists,
+# summaries); models without an entry use their own pool for every task.
+FAST_TIER = {
+    "gemini-flash": "gemini-flash-lite",
+}
+
+# Local OpenAI-compatible mock (mock_llm_server.py) for offline and CI runs.
+MOCK_LLM_API_BASE = os.getenv("MOCK_LLM_API_BASE")
+if MOCK_LLM_API_BASE:
+    MODEL_POOLS["local-mock"] = [
+        {"model": f"openai/{os.getenv('MOCK_LLM_PROFILE', 'mock-typical')}", "api_base": MOCK_LLM_API_BASE, "api_key": "mock"},
+    ]
+    MODEL_POOLS["local-mock-fast"] = [
+        {"model": "openai/mock-fast", "api_base": MOCK_LLM_API_BASE, "api_key": "mock"},
+    ]
+    FAST_TIER["local-mock"] = "local-mock-fast"
+
+WINDOW = 50                  # calls remembered per backend
+MIN_SAMPLES = 5              # below this a backend's p95 is not trusted
+DEFAULT_HEDGE_SECONDS = 12.0
+MAX_IN_FLIGHT = 2            # original request + one hedge
+REQUEST_TIMEOUT = 60
+COOLDOWN_ERRORS = 3          # consecutive errors that bench a backend...
+COOLDOWN_SECONDS = 30        # ...for this long
+
+# Bounds concurrent provider requests per process, hedges included.
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_ROUTER_WORKERS", "16")), thread_name_prefix="llm-router")
+
+
+class BackendStats:
+    def __init__(self):
+        self.calls = deque(maxlen=WINDOW)  # (latency_seconds, ok)
+        self.consecutive_errors = 0
+        self.benched_until = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self.lock:
+            self.calls.append((latency, ok))
+            if ok:
+                self.consecutive_errors = 0
+            else:
+                self.consecutive_errors += 1
+                if self.consecutive_errors >= COOLDOWN_ERRORS:
+                    self.benched_until = time.monotonic() + COOLDOWN_SECONDS
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            latencies = sorted(latency for latency, ok in self.calls if ok)
+            errors = sum(1 for _, ok in self.calls if not ok)
+            total = len(self.calls)
+            benched = time.monotonic() < self.benched_until
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+        return {
+            "calls": total,
+            "error_rate": errors / total if total else 0.0,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "benched": benched,
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _stats_for(backend: dict) -> BackendStats:
+    key = backend["model"]
+    with _stats_lock:
+        if key not in _stats:
+            _stats[key] = BackendStats()
+        return _stats[key]
+
+
+def pool_for(model: str) -> list:
+    """Backends for a logical model; a bare LiteLLM id is its own single-backend pool."""
+    return MODEL_POOLS.get(model, [{"model": model}])
+
+
+def model_for_tier(model: str, tier: str = None) -> str:
+    """Logical model serving `tier` ("fast" or None for the player's choice) on behalf of `model`."""
+    if tier == "fast":
+        return FAST_TIER.get(model, model)
+    return model
+
+
+def ranked_backends(model: str) -> list:
+    """Pool ordered healthiest first: benched last, then by error-weighted median latency."""
+    def score(indexed):
+        position, backend = indexed
+        stats = _stats_for(backend).snapshot()
+        if stats["p50"] is None:
+            # Untried backends keep their configured order, just behind proven ones.
+            return (stats["benched"], DEFAULT_HEDGE_SECONDS + position)
+        return (stats["benched"], stats["p50"] * (1 + 4 * stats["error_rate"]) + position * 0.01)
+    return [backend for _, backend in sorted(enumerate(pool_for(model)), key=score)]
+
+
+def hedge_delay(backend: dict) -> float:
+    stats = _stats_for(backend).snapshot()
+    if stats["calls"] < MIN_SAMPLES or stats["p95"] is None:
+        return DEFAULT_HEDGE_SECONDS
+    return stats["p95"]
+
+
+def _call_backend(backend: dict, kwargs: dict, on_response):
+    params = dict(backend, **kwargs)
+    params.setdefault("timeout", REQUEST_TIMEOUT)
+    started = time.monotonic()
+    try:
+        response = completion(**params)
+    except Exception:
+        _stats_for(backend).record(time.monotonic() - started, ok=False)
+        raise
+    _stats_for(backend).record(time.monotonic() - started, ok=True)
+    if on_response:
+        # Hedge losers are paid for too, so every response is reported.
+        try:
+            on_response(backend["model"], response)
+        except Exception:
+            pass
+    return response
+
+
+def complete(model: str, on_response=None, **kwargs):
+    """
+    Runs a completion against the model's pool and returns (response, backend_model).
+    `on_response(backend_model, response)` is called for every successful response.
+    Raises the last backend error if the whole pool fails.
+    """
+    backends = ranked_backends(model)
+    pending = {}
+    next_index = 0
+    last_error = None
+
+    def launch():
+        nonlocal next_index
+        backend = backends[next_index]
+        next_index += 1
+        pending[_executor.submit(_call_backend, backend, kwargs, on_response)] = backend
+        return backend
+
+    newest = launch()
+    while pending:
+        can_hedge = next_index < len(backends) and len(pending) < MAX_IN_FLIGHT
+        done, _ = wait(pending, timeout=hedge_delay(newest) if can_hedge else None, return_when=FIRST_COMPLETED)
+        if not done:
+            newest = launch()  # slow past p95: hedge on the next backend
+            continue
+        for future in done:
+            backend = pending.pop(future)
+            try:
+                return future.result(), backend["model"]
+            except Exception as e:
+                last_error = e
+        if next_index < len(backends) and len(pending) < MAX_IN_FLIGHT:
+            newest = launch()  # a request failed: fail over without waiting
+    raise last_error
+
+
+def health_report() -> dict:
+    """Rolling stats for every backend that has been called, keyed by LiteLLM model id."""
+    with _stats_lock:
+        items = list(_stats.items())
+    return {model: stats.snapshot() for model, stats in items}
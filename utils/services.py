@@ -1,9 +1,16 @@
 from datetime import datetime
+import hashlib
 from dateutil.relativedelta import relativedelta
-from utils.db import conn, execute_write
+import uuid
+from utils import resilience, similarity, transcripts
+from utils.db import NothingWritten, conn, execute_write, execute_writes
 
 def get_setting(key: str, default: str = "0") -> str:
-    df = conn.query("SELECT value FROM settings WHERE key = :setting LIMIT 1", params={"setting": key}, ttl=0)
+    df = resilience.read(
+        f"setting:{key}",
+        lambda: conn.query("SELECT value FROM settings WHERE key = :setting LIMIT 1", params={"setting": key}, ttl=0),
+        fresh_for=10
+    )
     return df["value"].iloc[0] if not df.empty else default
 
 def set_setting(key: str, value: str):
@@ -12,87 +19,353 @@ def set_setting(key: str, value: str):
         "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value",
         params=(key, value)
     )
+    resilience.invalidate(f"setting:{key}")
 
-def reset_daily_if_needed():
-    today = datetime.now().strftime("%Y-%m-%d")
-    if get_setting("current_date", "") != today:
-        set_setting("current_date", today)
-        set_setting("current_count", "0")
+DEFAULT_CHANNEL = "main"
+# Rollup key prefix for evaluate_scenarios.py runs, kept off the Operations page.
+EVAL_ROLLUP_PREFIX = "eval:"
 
-def get_usage() -> int:
-    reset_daily_if_needed()
-    return int(get_setting("current_count", "0"))
+def _data_version_statement(kind: str, channel_id: str):
+    return (
+        "INSERT INTO settings (key, value) VALUES ( %s , '1' ) "
+        "ON CONFLICT (key) DO UPDATE SET value = (settings.value::bigint + 1)::text",
+        (f"{kind}_version:{channel_id}",)
+    )
 
-def increment_usage():
-    reset_daily_if_needed()
-    current = get_usage()
-    set_setting("current_count", str(current + 1))
+def bump_data_version(kind: str, channel_id: str = DEFAULT_CHANNEL):
+    """Advance a channel's catalog/archive version that the JSON API derives its ETags from."""
+    execute_writes([_data_version_statement(kind, channel_id)])
 
-def increment_plays(scenario_title: str):
-    if scenario_title == "Audience with the Black Dragon":
-        return
-    execute_write(
-        "UPDATE scenarios SET plays = plays + 1 WHERE title = %s",
-        params=(scenario_title,)
-    )
+def get_daily_budget() -> dict:
+    """
+    Today's token and cost spend with the configured limits, in a single round trip.
+    Up to a few seconds old; raises resilience.DatabaseUnavailable if it can't be read at all.
+    """
+    df = resilience.read("daily_budget", _query_daily_budget, fresh_for=5)
+    row = df.iloc[0]
+    return {
+        "tokens": int(row["tokens"]),
+        "cost": float(row["cost"]),
+        "token_limit": int(row["token_limit"] or 0),
+        "cost_limit": float(row["cost_limit"] or 0),
+    }
+
+def _query_daily_budget():
+    return conn.query("""
+        SELECT
+            COALESCE(SUM(prompt_tokens + completion_tokens), 0) AS tokens,
+            COALESCE(SUM(cost_usd), 0) AS cost,
+            (SELECT value FROM settings WHERE key = 'daily_token_limit') AS token_limit,
+            (SELECT value FROM settings WHERE key = 'daily_cost_limit') AS cost_limit
+        FROM llm_usage_daily
+        WHERE day = CURRENT_DATE
+    """, ttl=0)
+
+def budget_fraction(budget: dict) -> float:
+    """Share of today's budget spent; a limit of 0 means that dimension is unlimited."""
+    fractions = [0.0]
+    if budget["token_limit"]:
+        fractions.append(budget["tokens"] / budget["token_limit"])
+    if budget["cost_limit"]:
+        fractions.append(budget["cost"] / budget["cost_limit"])
+    return max(fractions)
+
+def budget_exhausted() -> bool:
+    try:
+        return budget_fraction(get_daily_budget()) >= 1
+    except resilience.DatabaseUnavailable:
+        return True  # spend can't be checked, so none is allowed
+
+def record_llm_usage(model: str, journey_id, prompt_tokens: int, completion_tokens: int, cost: float):
+    """Adds one call's tokens and cost to the per-day/per-model and per-journey totals."""
+    statements = [("""
+        INSERT INTO llm_usage_daily (day, model, calls, prompt_tokens, completion_tokens, cost_usd)
+        VALUES (%s, %s, 1, %s, %s, %s)
+        ON CONFLICT (day, model) DO UPDATE SET
+            calls = llm_usage_daily.calls + 1,
+            prompt_tokens = llm_usage_daily.prompt_tokens + EXCLUDED.prompt_tokens,
+            completion_tokens = llm_usage_daily.completion_tokens + EXCLUDED.completion_tokens,
+            cost_usd = llm_usage_daily.cost_usd + EXCLUDED.cost_usd
+    """, (datetime.now().date(), model, prompt_tokens, completion_tokens, cost))]
+    if journey_id:
+        statements.append(("""
+            INSERT INTO journey_usage (journey_id, model, calls, prompt_tokens, completion_tokens, cost_usd)
+            VALUES (%s, %s, 1, %s, %s, %s)
+            ON CONFLICT (journey_id) DO UPDATE SET
+                calls = journey_usage.calls + 1,
+                prompt_tokens = journey_usage.prompt_tokens + EXCLUDED.prompt_tokens,
+                completion_tokens = journey_usage.completion_tokens + EXCLUDED.completion_tokens,
+                cost_usd = journey_usage.cost_usd + EXCLUDED.cost_usd,
+                updated_at = NOW()
+        """, (journey_id, model, prompt_tokens, completion_tokens, cost)))
+    resilience.write(statements)
+    resilience.invalidate("daily_budget")
+
+def _rollup_statement(scenario, model, at, **counters):
+    """Upsert adding `counters` to the ops_rollup_hourly row for (hour of `at`, scenario, model)."""
+    columns = list(counters)
+    updates = [f"{c} = ops_rollup_hourly.{c} + EXCLUDED.{c}" for c in columns]
+    if "llm_latency_ms" in counters:
+        columns.append("llm_latency_max_ms")
+        counters["llm_latency_max_ms"] = counters["llm_latency_ms"]
+        updates.append("llm_latency_max_ms = GREATEST(ops_rollup_hourly.llm_latency_max_ms, EXCLUDED.llm_latency_max_ms)")
+    return (f"""
+        INSERT INTO ops_rollup_hourly (bucket, scenario, model, {", ".join(columns)})
+        VALUES (date_trunc('hour', %s::timestamp), %s, %s, {", ".join(["%s"] * len(columns))})
+        ON CONFLICT (bucket, scenario, model) DO UPDATE SET {", ".join(updates)}
+    """, (at, scenario or "", model or "", *counters.values()))
+
+def rollup_scenario(scenario_id, scenario_title) -> str:
+    """What the ops rollups count a scenario under: its id, or its title for the Black Dragon, which has none."""
+    return str(scenario_id) if scenario_id else scenario_title
+
+def record_llm_call(scenario: str, model: str, latency_ms: int, ok: bool):
+    """Counts one call_llm round trip (hedges and failovers included) in the hourly rollup."""
+    counters = {"llm_latency_ms": latency_ms} if ok else {"llm_errors": 1}
+    resilience.write([_rollup_statement(scenario, model, datetime.now(), llm_calls=1, **counters)])
 
-def record_journey(scenario_title, model_name, choice_text, summary, author):
-    execute_write("""
+def get_ops_rollup(grain: str, since: datetime):
+    """
+    Rollup totals per `grain` ('hour' or 'day'), scenario (by its current title) and model since the given time.
+    Evaluation runs are left out.
+    """
+    return conn.query("""
+        SELECT
+            date_trunc(:grain, r.bucket) AS period, COALESCE(s.title, r.scenario) AS scenario, r.model,
+            SUM(r.plays)::BIGINT AS plays,
+            SUM(r.journeys)::BIGINT AS journeys,
+            SUM(r.llm_calls)::BIGINT AS llm_calls,
+            SUM(r.llm_errors)::BIGINT AS llm_errors,
+            SUM(r.llm_latency_ms)::BIGINT AS llm_latency_ms,
+            MAX(r.llm_latency_max_ms) AS llm_latency_max_ms
+        FROM ops_rollup_hourly r
+        LEFT JOIN scenarios s ON s.id::text = r.scenario
+        WHERE r.bucket >= :since AND r.scenario NOT LIKE :eval_pattern
+        GROUP BY 1, 2, 3
+        ORDER BY 1
+    """, params={"grain": grain, "since": since, "eval_pattern": EVAL_ROLLUP_PREFIX + "%"}, ttl=60)
+
+def increment_plays(scenario_id, scenario_title: str, model: str = None):
+    # The Black Dragon has no scenarios row (scenario_id is None), but its plays still count operationally.
+    # The catalog version isn't bumped: the API refreshes play counts on its own schedule (api.PLAYS_REFRESH_SECONDS).
+    statements = [_rollup_statement(rollup_scenario(scenario_id, scenario_title), model, datetime.now(), plays=1)]
+    if scenario_id:
+        statements.append(("UPDATE scenarios SET plays = plays + 1 WHERE id = %s", (str(scenario_id),)))
+    resilience.write(statements)
+
+def record_journey(scenario_id, scenario_title, model_name, choice_text, summary, author, journey_id=None, messages=None, channel_id=DEFAULT_CHANNEL):
+    """
+    Saves the journey, or spools it for replay if the database is unavailable.
+    Returns False when spooled; the journey then reaches the archive once the database is back.
+    scenario_id is None for the Black Dragon; scenario_title is kept as the title was when played.
+    """
+    journey_id = journey_id or str(uuid.uuid4())
+    scenario_id = str(scenario_id) if scenario_id else None
+    now = datetime.now()
+    # Explicit timestamps and ON CONFLICT DO NOTHING keep a replayed journey in its own hour and archived once.
+    statements = [("""
         INSERT INTO journeys 
-        (scenario_title, llm_model, choice_text, summary, author)
-        VALUES (%s, %s, %s, %s, %s)
-    """, params=(scenario_title, model_name, choice_text, summary, author))
+        (id, scenario_id, scenario_title, llm_model, choice_text, summary, author, channel_id, submitted_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT DO NOTHING
+    """, (journey_id, scenario_id, scenario_title, model_name, choice_text, summary, author, channel_id, now)),
+        _rollup_statement(rollup_scenario(scenario_id, scenario_title), model_name, now, journeys=1),
+    ]
+    if messages:
+        statements += _transcript_statements(journey_id, scenario_id, scenario_title, messages)
+    statements.append(_data_version_statement("archive", channel_id))
+    written = resilience.write(statements)
+    resilience.invalidate(f"archive:{channel_id}")
+    return written
 
-def propose_scenario(title, description, prompt, author, category, release_date, opening_scene, soundtrack):
-    execute_write("""
-        INSERT INTO pending_scenarios 
-        (title, description, prompt, author, category, release_date, opening_scene, soundtrack)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """, params=(title, description, prompt, author, category, release_date, opening_scene, soundtrack))
+def _latest_transcript_dictionary(scenario_id: str):
+    """(id, bytes) of the dictionary new transcripts of the scenario are compressed with, or (None, None)."""
+    df = conn.query("""
+        SELECT id, encode(dictionary, 'hex') AS dictionary FROM transcript_dictionaries
+        WHERE scenario_id = :scenario
+        ORDER BY created_at DESC, id
+        LIMIT 1
+    """, params={"scenario": scenario_id}, ttl=600)
+    if df.empty:
+        return None, None
+    return df["id"].iloc[0], bytes.fromhex(df["dictionary"].iloc[0])
+
+def _transcript_statements(journey_id, scenario_id, scenario_title, messages):
+    system_prompt, dialogue = transcripts.split_messages(messages)
+    statements = []
+    dictionary_id = None  # the Black Dragon's prompt follows the catalog, so it isn't trained for
+    if scenario_id:
+        try:
+            dictionary_id, dictionary = _latest_transcript_dictionary(scenario_id)
+        except Exception:
+            pass  # database unavailable: the raw dictionary needs no lookup
+    if dictionary_id is None:
+        dictionary = transcripts.raw_dictionary(system_prompt, dialogue[:1])
+        dictionary_id = transcripts.sha256(dictionary)
+        statements.append(("""
+            INSERT INTO transcript_dictionaries (id, scenario_id, scenario_title, kind, dictionary)
+            VALUES (%s, %s, %s, 'raw', %s)
+            ON CONFLICT (id) DO NOTHING
+        """, (dictionary_id, scenario_id, scenario_title, dictionary)))
 
-def approve_scenario(scenario_id, title, description, prompt, author, category, release_date, opening_scene, soundtrack):
-    execute_write("""
-        INSERT INTO scenarios (title, description, prompt, author, category, release_date, opening_scene, soundtrack)
+    prompt_sha256 = None
+    if system_prompt is not None:
+        prompt_sha256 = transcripts.sha256(system_prompt)
+        statements.append((
+            "INSERT INTO transcript_prompts (sha256, content) VALUES (%s, %s) ON CONFLICT (sha256) DO NOTHING",
+            (prompt_sha256, system_prompt)
+        ))
+
+    statements.append(("""
+        INSERT INTO journey_transcripts
+        (journey_id, scenario_id, scenario_title, prompt_sha256, dictionary_id, message_count, raw_bytes, transcript)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (title) DO NOTHING
-    """, params=(title, description, prompt, author, category, release_date, opening_scene, soundtrack))
-    execute_write("UPDATE pending_scenarios SET status = 'approved' WHERE id = %s", params=(scenario_id,))
+        ON CONFLICT (journey_id) DO NOTHING
+    """, (journey_id, scenario_id, scenario_title, prompt_sha256, dictionary_id, len(dialogue),
+          len(transcripts.encode_messages(dialogue)), transcripts.compress(dialogue, dictionary))))
+    return statements
+
+def load_transcript(journey_id) -> list:
+    """The journey's full message list, system prompt included, or [] if none was stored."""
+    df = conn.query("""
+        SELECT encode(t.transcript, 'hex') AS transcript, encode(d.dictionary, 'hex') AS dictionary, p.content AS system_prompt
+        FROM journey_transcripts t
+        JOIN transcript_dictionaries d ON d.id = t.dictionary_id
+        LEFT JOIN transcript_prompts p ON p.sha256 = t.prompt_sha256
+        WHERE t.journey_id = :id
+    """, params={"id": str(journey_id)}, ttl=3600)
+    if df.empty:
+        return []
+    row = df.iloc[0]
+    messages = transcripts.decompress(bytes.fromhex(row["transcript"]), bytes.fromhex(row["dictionary"]))
+    if isinstance(row["system_prompt"], str):
+        messages = [{"role": "system", "content": row["system_prompt"]}] + messages
+    return messages
+
+def propose_scenario(title, description, prompt, author, category, release_date, opening_scene, soundtrack, channel_id=DEFAULT_CHANNEL):
+    scenario_id = str(uuid.uuid4())
+    execute_writes([("""
+        INSERT INTO pending_scenarios 
+        (id, title, description, prompt, author, category, release_date, opening_scene, soundtrack, channel_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (scenario_id, title, description, prompt, author, category, release_date, opening_scene, soundtrack, channel_id))]
+        + similarity.index_statements("pending", scenario_id, title, description, prompt))
+    return scenario_id
+
+def approve_scenario(scenario_id, title, description, prompt, author, category, release_date, opening_scene, soundtrack, channel_id=DEFAULT_CHANNEL):
+    """
+    Publishes a pending submission. Returns False, leaving it pending, if the channel
+    already has a live scenario with the same title.
+    """
+    live_id = str(uuid.uuid4())
+    try:
+        execute_writes([("""
+        INSERT INTO scenarios (id, title, description, prompt, author, category, release_date, opening_scene, soundtrack, channel_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (channel_id, title) DO NOTHING
+    """, (live_id, title, description, prompt, author, category, release_date, opening_scene, soundtrack, channel_id)),
+            ("UPDATE pending_scenarios SET status = 'approved' WHERE id = %s", (scenario_id,))]
+            + similarity.unindex_statements("pending", scenario_id)
+            + similarity.index_statements("live", live_id, title, description, prompt), required={0})
+    except NothingWritten:
+        return False
+    catalog_changed(channel_id)
+    return True
 
 def reject_scenario(scenario_id):
-    execute_write("UPDATE pending_scenarios SET status = 'rejected' WHERE id = %s", params=(scenario_id,))
+    execute_writes(
+        [("UPDATE pending_scenarios SET status = 'rejected' WHERE id = %s", (scenario_id,))]
+        + similarity.unindex_statements("pending", scenario_id)
+    )
 
-def update_scenario(scenario_id, status, title, description, prompt, author, category, release_date, opening_scene, soundtrack):
+def update_scenario(scenario_id, status, title, description, prompt, author, category, release_date, opening_scene, soundtrack, channel_id=DEFAULT_CHANNEL):
     """Updates a scenario in either the live or pending table based on its status."""
     table = "scenarios" if status == "Approved" else "pending_scenarios"
-    execute_write(f"""
+    source = "live" if status == "Approved" else "pending"
+    execute_writes([(f"""
         UPDATE {table} 
         SET title = %s, description = %s, prompt = %s, author = %s, 
             category = %s, release_date = %s, opening_scene = %s, soundtrack = %s
         WHERE id = %s
-    """, params=(title, description, prompt, author, category, release_date, opening_scene, soundtrack, scenario_id))
+    """, (title, description, prompt, author, category, release_date, opening_scene, soundtrack, scenario_id))]
+        + similarity.index_statements(source, scenario_id, title, description, prompt))
+    if table == "scenarios":
+        catalog_changed(channel_id)
 
-def release_scenario_early(scenario_id):
+def release_scenario_early(scenario_id, channel_id=DEFAULT_CHANNEL):
     execute_write("UPDATE scenarios SET release_date = NOW() WHERE id = %s", params=(scenario_id,))
+    catalog_changed(channel_id)
+
+def catalog_changed(channel_id: str):
+    """After an edit to a channel's live scenarios: refresh this server's cached catalog and the API's ETag."""
+    resilience.invalidate(f"catalog:{channel_id}")
+    bump_data_version("catalog", channel_id)
+
+def load_channels() -> dict:
+    try:
+        return resilience.read("channels", _query_channels, fresh_for=300)
+    except resilience.DatabaseUnavailable:
+        return {DEFAULT_CHANNEL: {"name": "Main", "description": None}}
+
+def _query_channels() -> dict:
+    df = conn.query("SELECT id, name, description FROM channels ORDER BY (id <> 'main'), name", ttl=0)
+    return {row.id: {"name": row.name, "description": row.description} for row in df.itertuples()}
+
+def is_channel_moderator(channel_id: str, password: str) -> bool:
+    df = conn.query(
+        "SELECT 1 FROM channel_moderators WHERE channel_id = :channel AND password_hash = :hash LIMIT 1",
+        params={"channel": channel_id, "hash": hashlib.sha256(password.encode()).hexdigest()}, ttl=0
+    )
+    return not df.empty
+
+def create_channel(channel_id: str, name: str, description: str = None):
+    execute_write(
+        "INSERT INTO channels (id, name, description) VALUES (%s, %s, %s)",
+        params=(channel_id, name, description)
+    )
+    resilience.invalidate("channels")
+
+def add_channel_moderator(channel_id: str, name: str, password_hash: str):
+    execute_write(
+        "INSERT INTO channel_moderators (channel_id, name, password_hash) VALUES (%s, %s, %s) "
+        "ON CONFLICT (channel_id, name) DO UPDATE SET password_hash = EXCLUDED.password_hash",
+        params=(channel_id, name, password_hash)
+    )
 
 def load_categories():
     try:
-        df = conn.query("SELECT name FROM categories ORDER BY name", ttl=0)
+        df = resilience.read("categories", lambda: conn.query("SELECT name FROM categories ORDER BY name", ttl=0), fresh_for=300)
         if not df.empty:
             return ["Uncategorized"] + sorted(df["name"].tolist())
-    except:
+    except resilience.DatabaseUnavailable:
         pass
     return ["Uncategorized", "Choices", "Explorations"]
 
-def load_scenarios():
+def load_scenarios(channel_id: str = DEFAULT_CHANNEL):
+    """
+    A channel's released scenarios plus its Black Dragon, from this server's snapshot of the catalog.
+    catalog_changed invalidates it; otherwise it is revalidated in the background every five minutes,
+    which covers embargoes expiring and edits made on other servers. With the database unavailable and
+    no snapshot yet, only the Black Dragon is offered.
+    """
+    try:
+        scenarios = resilience.read(f"catalog:{channel_id}", lambda: _query_scenarios(channel_id), fresh_for=300)
+    except resilience.DatabaseUnavailable:
+        scenarios = {}
+    scenarios["Audience with the Black Dragon"] = get_black_dragon_scenario(scenarios)
+    return scenarios
+
+def _query_scenarios(channel_id: str) -> dict:
     now = datetime.now()
     df = conn.query("""
-        SELECT title, description, prompt, author, plays, category, opening_scene, soundtrack
+        SELECT id, title, description, prompt, author, plays, category, opening_scene, soundtrack
         FROM scenarios 
-        WHERE (release_date IS NULL OR release_date <= :time)
+        WHERE channel_id = :channel AND (release_date IS NULL OR release_date <= :time)
         ORDER BY submitted_at DESC
-    """, params={"time": now}, ttl=0)
+    """, params={"channel": channel_id, "time": now}, ttl=0)
     
     scenarios = {row.title: {
+        "id": str(row.id),
         "description": row.description,
         "prompt": row.prompt,
         "author": row.author or "Anonymous",
@@ -102,11 +375,24 @@ def load_scenarios():
         "soundtrack": row.soundtrack
     } for _, row in df.iterrows()}
     
-    # Add Black Dragon meta-scenario
-    scenarios["Audience with the Black Dragon"] = get_black_dragon_scenario(scenarios)
-    
     return scenarios
 
+def load_archive_page(channel_id: str):
+    """
+    The channel's 50 most recent journeys, at most ten seconds old unless the database is unavailable.
+    Journeys show their scenario's current title, or the title they were recorded under if it has none.
+    """
+    return resilience.read(f"archive:{channel_id}", lambda: conn.query("""
+        SELECT j.id, j.scenario_id, COALESCE(s.title, j.scenario_title) AS scenario_title,
+               j.llm_model, j.choice_text, j.summary, j.author, j.submitted_at,
+               EXISTS (SELECT 1 FROM journey_transcripts t WHERE t.journey_id = j.id) AS has_transcript
+        FROM journeys j
+        LEFT JOIN scenarios s ON s.id = j.scenario_id
+        WHERE j.channel_id = :channel
+        ORDER BY j.submitted_at DESC 
+        LIMIT 50
+    """, params={"channel": channel_id}, ttl=0), fresh_for=10)
+
 def get_black_dragon_scenario(public_scenarios):
     summary = "\n".join([
         f"- **{title}** ({data['category']}): {data['description']}"
@@ -124,6 +410,7 @@ Speak in a deep, wise, draconic voice. Discuss, compare, critique, or connect th
 Encourage reflection on the weight of choices across timelines. Remain cryptic yet illuminating.
 """
     return {
+        "id": None,
         "description": "Consult the Black Dragon, keeper of all public dilemmas, for meta-reflection and comparison.",
         "prompt": prompt,
         "author": "The Void",
@@ -132,3 +419,58 @@ Encourage reflection on the weight of choices across timelines. Remain cryptic y
         "opening_scene": "The Black Dragon uncoils its obsidian length, its eyes like burning coals. 'You seek perspective on the choices recorded here?' it rumbles. 'Speak, and let us weigh the threads of fate together.'",
         "soundtrack": "https://www.orangefreesounds.com/wp-content/uploads/2020/02/Deep-hum-sound.mp3"
     }
+
+# --- Near-duplicate detection (MinHash/LSH, see utils/similarity.py) ---
+def find_near_duplicates(title, description, prompt, exclude_id=None):
+    """Live and pending scenarios whose estimated similarity passes the threshold, best first."""
+    sig = similarity.signature(title, description, prompt)
+    df = conn.query("""
+        SELECT DISTINCT m.source, m.scenario_id, m.title, encode(m.signature, 'hex') AS signature
+        FROM scenario_lsh_buckets b
+        JOIN scenario_minhash m ON m.source = b.source AND m.scenario_id = b.scenario_id
+        WHERE (b.band, b.bucket) IN (
+            SELECT * FROM unnest(CAST(:bands AS smallint[]), CAST(:buckets AS bigint[]))
+        )
+    """, params={"bands": list(range(similarity.BANDS)), "buckets": similarity.band_buckets(sig)}, ttl=0)
+
+    matches = []
+    for row in df.itertuples():
+        if exclude_id is not None and str(row.scenario_id) == str(exclude_id):
+            continue
+        score = similarity.similarity(sig, similarity.from_hex(row.signature))
+        if score >= similarity.DUPLICATE_THRESHOLD:
+            matches.append({"source": row.source, "id": row.scenario_id, "title": row.title, "score": score})
+    return sorted(matches, key=lambda m: -m["score"])
+
+def near_duplicates_for_entries(entries):
+    """
+    Maps each curate-page entry id to its near-duplicates among the other entries.
+    Candidates come from shared LSH buckets; entries without a signature yet are indexed
+    by `journey_archive.py maintain`.
+    """
+    keyed = {("live" if row.status == "Approved" else "pending", str(row.id)): row for row in entries.itertuples()}
+    pairs = conn.query("""
+        WITH shown AS (
+            SELECT * FROM unnest(CAST(:sources AS text[]), CAST(:ids AS uuid[])) AS s(source, scenario_id)
+        )
+        SELECT DISTINCT a.source, a.scenario_id, b.source AS other_source, b.scenario_id AS other_id,
+               encode(ma.signature, 'hex') AS signature, encode(mb.signature, 'hex') AS other_signature
+        FROM scenario_lsh_buckets a
+        JOIN shown sa ON sa.source = a.source AND sa.scenario_id = a.scenario_id
+        JOIN scenario_lsh_buckets b ON b.band = a.band AND b.bucket = a.bucket
+        JOIN shown sb ON sb.source = b.source AND sb.scenario_id = b.scenario_id
+        JOIN scenario_minhash ma ON ma.source = a.source AND ma.scenario_id = a.scenario_id
+        JOIN scenario_minhash mb ON mb.source = b.source AND mb.scenario_id = b.scenario_id
+        WHERE (a.source, a.scenario_id) <> (b.source, b.scenario_id)
+    """, params={"sources": [key[0] for key in keyed], "ids": [key[1] for key in keyed]}, ttl=0)
+
+    result = {}
+    for pair in pairs.itertuples():
+        score = similarity.similarity(similarity.from_hex(pair.signature), similarity.from_hex(pair.other_signature))
+        if score >= similarity.DUPLICATE_THRESHOLD:
+            other = (pair.other_source, str(pair.other_id))
+            row = keyed[(pair.source, str(pair.scenario_id))]
+            result.setdefault(row.id, []).append(
+                {"source": other[0], "id": other[1], "title": keyed[other].title, "score": score}
+            )
+    return {entry_id: sorted(matches, key=lambda m: -m["score"]) for entry_id, matches in result.items()}
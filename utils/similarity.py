@@ -0,0 +1,101 @@
+"""
+MinHash signatures and LSH banding for spotting near-duplicate scenarios.
+
+A scenario's text (title, description, prompt) is reduced to word 5-gram
+shingles and summarised by NUM_PERM min-hashes; the fraction of equal
+min-hashes estimates the Jaccard similarity of the shingle sets. Splitting the
+signature into BANDS bands of ROWS rows and hashing each band gives LSH
+buckets: two scenarios sharing any bucket are candidates, which keeps lookups
+proportional to the matches rather than to the number of scenarios.
+Signatures and buckets are stored in scenario_minhash and scenario_lsh_buckets;
+index_statements() builds the writes that keep one scenario's rows current.
+"""
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS      # candidate threshold ~ (1 / BANDS) ** (1 / ROWS) ≈ 0.42
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.5     # estimated Jaccard at which a pair is flagged
+
+_PRIME = (1 << 31) - 1
+_CHUNK = 8192
+_rng = np.random.RandomState(20240611)  # fixed: stored signatures must stay comparable
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+
+def shingles(text: str) -> np.ndarray:
+    """Distinct 32-bit hashes of the word 5-grams of the normalised text."""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+def signature(title: str, description: str, prompt: str) -> np.ndarray:
+    hashes = shingles(" ".join(part or "" for part in (title, description, prompt))) % _PRIME
+    result = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    # Chunked so megabyte prompts don't materialise a (shingles x NUM_PERM) matrix at once.
+    for start in range(0, len(hashes), _CHUNK):
+        chunk = hashes[start:start + _CHUNK]
+        permuted = (np.outer(chunk, _A) + _B) % _PRIME
+        np.minimum(result, permuted.min(axis=0), out=result)
+    return result.astype(np.uint32)
+
+
+def band_buckets(sig: np.ndarray) -> list:
+    """One signed 64-bit bucket id per band (fits a Postgres BIGINT)."""
+    return [
+        int.from_bytes(hashlib.blake2b(sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(), "big", signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+
+def from_hex(data: str) -> np.ndarray:
+    """Inverse of to_bytes for signatures read as encode(signature, 'hex'), which cache cleanly."""
+    return np.frombuffer(bytes.fromhex(data), dtype="<u4")
+
+
+# --- Index rows (scenario_minhash and scenario_lsh_buckets) ---
+_SOURCE_TABLES = {"live": "scenarios", "pending": "pending_scenarios"}
+
+
+def index_statements(source: str, scenario_id, title: str, description: str, prompt: str) -> list:
+    """Statements replacing one scenario's signature and LSH buckets; a no-op if the row doesn't exist."""
+    sig = signature(title, description, prompt)
+    buckets = band_buckets(sig)
+    exists = f"EXISTS (SELECT 1 FROM {_SOURCE_TABLES[source]} WHERE id = %s)"
+    return unindex_statements(source, scenario_id) + [
+        (f"""
+            INSERT INTO scenario_minhash (source, scenario_id, title, signature)
+            SELECT %s, %s, %s, %s WHERE {exists}
+        """, (source, scenario_id, title, to_bytes(sig), scenario_id)),
+        (f"""
+            INSERT INTO scenario_lsh_buckets (band, bucket, source, scenario_id)
+            SELECT b.band, b.bucket, %s, %s
+            FROM unnest(%s::smallint[], %s::bigint[]) AS b(band, bucket)
+            WHERE {exists}
+        """, (source, scenario_id, list(range(BANDS)), buckets, scenario_id)),
+    ]
+
+
+def unindex_statements(source: str, scenario_id) -> list:
+    return [
+        ("DELETE FROM scenario_lsh_buckets WHERE source = %s AND scenario_id = %s", (source, scenario_id)),
+        ("DELETE FROM scenario_minhash WHERE source = %s AND scenario_id = %s", (source, scenario_id)),
+    ]
@@ -0,0 +1,63 @@
+"""
+zstd compression of journey transcripts with per-scenario dictionaries.
+
+Transcripts of one scenario all open with the same scene and echo the same
+prompt, so a dictionary built from that shared text lets even short journeys
+compress well. A scenario starts with a raw-content dictionary seeded from its
+system prompt and opening scene; once enough transcripts exist, a dictionary
+trained on them replaces it for new journeys. Dictionaries and system prompts
+are content-addressed by sha256, and each transcript records which ones it
+needs, so older transcripts stay readable after either changes.
+"""
+import hashlib
+import json
+
+import zstandard as zstd
+
+LEVEL = 15
+DICTIONARY_SIZE = 16 * 1024
+MIN_TRAINING_SAMPLES = 100
+MAX_TRAINING_SAMPLES = 2000
+
+_dictionaries = {}  # sha256 -> ZstdCompressionDict; (de)compressors aren't thread-safe, so only these are shared
+
+
+def sha256(data) -> str:
+    return hashlib.sha256(data.encode() if isinstance(data, str) else data).hexdigest()
+
+
+def encode_messages(messages: list) -> bytes:
+    return json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def split_messages(messages: list):
+    """(system_prompt or None, remaining messages) for a session transcript."""
+    if messages and messages[0]["role"] == "system":
+        return messages[0]["content"], messages[1:]
+    return None, messages
+
+
+def raw_dictionary(system_prompt: str, opening: list) -> bytes:
+    """Raw-content dictionary; the opening goes last because zstd matches nearby content most cheaply."""
+    return (system_prompt or "").encode() + encode_messages(opening)
+
+
+def train_dictionary(payloads: list) -> bytes:
+    """Dictionary trained on encoded transcripts; raises zstd.ZstdError when the samples are too few or too small."""
+    return zstd.train_dictionary(DICTIONARY_SIZE, payloads[-MAX_TRAINING_SAMPLES:], level=LEVEL).as_bytes()
+
+
+def _dictionary(data: bytes) -> zstd.ZstdCompressionDict:
+    key = sha256(data)
+    if key not in _dictionaries:
+        # DICT_TYPE_AUTO: trained dictionaries carry the zstd magic number, raw text never does.
+        _dictionaries[key] = zstd.ZstdCompressionDict(data)
+    return _dictionaries[key]
+
+
+def compress(messages: list, dictionary: bytes) -> bytes:
+    return zstd.ZstdCompressor(level=LEVEL, dict_data=_dictionary(dictionary)).compress(encode_messages(messages))
+
+
+def decompress(blob: bytes, dictionary: bytes) -> list:
+    return json.loads(zstd.ZstdDecompressor(dict_data=_dictionary(dictionary)).decompress(blob))
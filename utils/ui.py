@@ -2,16 +2,21 @@ import streamlit as st
 import streamlit.components.v1 as components
 import os
 import utils.services as services
-from utils.llm import call_llm
+from utils.llm import call_llm, parse_choices, PLAY_STYLE_PROMPT, CHOICE_PROMPT, SUMMARY_PROMPT
+from utils import profiler, resilience, router
+from utils.ratelimit import RateLimitExceeded
 from utils.db import conn
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import hashlib
+import uuid
 
 MODEL_OPTIONS = {
-    "Gemini 3.0 Flash": "gemini/gemini-3-flash-preview",
+    "Gemini 3.0 Flash": "gemini-flash",  # routed over a backend pool, see utils/router.py
     "Dummy LLM (No Cost)": "dummy",
 }
+if "local-mock" in router.MODEL_POOLS:
+    MODEL_OPTIONS["Local Mock LLM"] = "local-mock"
 
 def render_landing_page():
     st.header("How to Use This Site")
@@ -63,13 +68,25 @@ def render_sidebar_info():
     )
 
     # --- Footer Usage ---
-    limit = int(services.get_setting("daily_limit", "150"))
-    used = services.get_usage()
-    st.sidebar.metric("Global Choices Today", f"{used}/{limit}")
-    if used >= limit:
+    try:
+        budget = services.get_daily_budget()
+    except resilience.DatabaseUnavailable:
+        st.sidebar.warning("Today's budget can't be checked right now, so the machine minds are resting.")
+        return
+    used = services.budget_fraction(budget)
+    st.sidebar.metric(
+        "Global Budget Today", f"{used:.0%}",
+        help=f"{budget['tokens']:,} tokens · ${budget['cost']:.2f} spent today"
+    )
+    if used >= 1:
         st.sidebar.warning("Daily limit reached — return tomorrow.")
     else:
-        st.sidebar.progress(used / limit)
+        st.sidebar.progress(used)
+
+def render_rate_limited(error):
+    """Retry-after notice; any click reruns the calling fragment, which retries the call."""
+    st.warning(f"The machine minds need a moment to breathe. Try again in {error.retry_after}s.")
+    st.button("↻ Try again", key="rate_limit_retry")
 
 @st.fragment
 def render_setup_fragment(scenarios):
@@ -93,41 +110,23 @@ def render_setup_fragment(scenarios):
     st.markdown(f"*{scenario['category']}*{author_credit} — {scenario['plays']} plays")
     st.info(scenario["description"])
     
-    prompt_prefix = """
-CRITICAL INTERACTION STYLE:
-- Never present A/B/C/D options
-- Never list "you could do X, Y, or Z"
-- Ask open questions and let the user respond freely
-- React to what they actually say/do
-- If they're uncertain, ask clarifying questions
-- Draw out their reasoning through dialogue
-- Let choices emerge from conversation, not menu selection
-
-Example:
-WRONG: "What do you do? A) Tell them B) Hide it C) Run away"
-RIGHT: "The parrot is still talking. What do you do?" 
-       [User responds naturally, you react to their specific choice]
-Also add:
-PACING:
-- Keep responses short (2-4 sentences usually)
-- Present one moment/beat at a time
-- Wait for user response before continuing
-- Don't rush through the scenario
-- Let tension build naturally
-- Allow pauses and uncertainty
-- Don't present options, except if characters do
-"""
     if st.button("🚀 Begin Your Journey", type="primary", use_container_width=True):
         st.session_state.messages = [
-            {"role": "system", "content": prompt_prefix + scenario["prompt"]},
+            {"role": "system", "content": PLAY_STYLE_PROMPT + scenario["prompt"]},
             {"role": "assistant", "content": scenario["opening_scene"]}
         ]
         st.session_state.current_scenario = scenario_key
+        st.session_state.current_scenario_id = scenario.get("id")
         st.session_state.current_model = model_id
+        st.session_state.journey_id = str(uuid.uuid4())
+        st.session_state.journey_channel = current_channel()
         st.session_state.play_phase = "roleplay"
-        services.increment_plays(scenario_key)
+        services.increment_plays(scenario.get("id"), scenario_key, model_id)
         st.rerun(scope="app")
 
+def _rollup_scenario():
+    return services.rollup_scenario(st.session_state.get("current_scenario_id"), st.session_state.get("current_scenario"))
+
 @st.fragment
 def render_roleplay_fragment():
     # Use a container to allow clearing or updating sections
@@ -150,10 +149,20 @@ def render_roleplay_fragment():
     if is_waiting_for_llm:
         with chat_container:
             with st.chat_message("assistant"):
-                with st.spinner("The story unfolds..."):
-                    response = call_llm(st.session_state.current_model, st.session_state.messages)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-        st.rerun() # Local rerun to show response and clear user input state
+                try:
+                    with st.spinner("The story unfolds..."):
+                        response = call_llm(
+                            st.session_state.current_model,
+                            st.session_state.messages,
+                            journey_id=st.session_state.get("journey_id"),
+                            scenario=_rollup_scenario()
+                        )
+                except RateLimitExceeded as e:
+                    render_rate_limited(e)
+                    response = None
+        if response is not None:
+            st.session_state.messages.append({"role": "assistant", "content": response})
+            st.rerun() # Local rerun to show response and clear user input state
 
     st.markdown("---")
     # This button triggers a full page update to change phase
@@ -167,31 +176,21 @@ def render_choice_fragment():
     st.write("The story has reached a critical juncture. What do you decide?")
 
     if "generated_choices" not in st.session_state:
-        choice_prompt = """
-Based on the conversation so far, generate 4 concrete, distinct choices the protagonist now faces.
-Number them 1–4 and keep each under 25 words.
-Do not add commentary or continuation — only the numbered list.
-"""         
-        with st.spinner("Deriving possible choices..."):
-            choices_text = call_llm(
-                st.session_state.current_model,
-                st.session_state.messages,
-                system_prompt=choice_prompt
-            )
+        try:
+            with st.spinner("Deriving possible choices..."):
+                choices_text = call_llm(
+                    st.session_state.current_model,
+                    st.session_state.messages,
+                    system_prompt=CHOICE_PROMPT,
+                    journey_id=st.session_state.get("journey_id"),
+                    scenario=_rollup_scenario(),
+                    task="choices"
+                )
+        except RateLimitExceeded as e:
+            render_rate_limited(e)
+            return
 
-        choices = []
-        if choices_text:
-            choice_lines = [line.strip() for line in choices_text.split("\n") if line.strip() and (line[0].isdigit() or "." in line[:3])]
-            for line in choice_lines[:4]:
-                if ". " in line:
-                    text = line.split(". ", 1)[1]
-                elif ":" in line:
-                    text = line.split(":", 1)[1].strip()
-                else:
-                    text = line
-                choices.append(text)    
-        
-        st.session_state.generated_choices = choices
+        st.session_state.generated_choices = parse_choices(choices_text) if choices_text else []
 
     choices = st.session_state.generated_choices
     selected_choice = st.radio("Choose one:", choices + ["Other (write your own)"], key="choice_radio")
@@ -222,18 +221,20 @@ def render_summary_fragment():
     st.write("Reflect on the path taken and your final choice.")
 
     if "ai_summary" not in st.session_state:
-        summary_prompt = f"""
-Summarize the entire story journey in 150–250 words from a neutral third-person perspective.
-Include key events, internal conflicts, and end with the final choice: "{st.session_state.final_choice}".
-Focus on the ethical dimensions and emotional weight.
-"""
-        with st.spinner("Crafting a summary of your path..."):
-            ai_summary = call_llm(
-                st.session_state.current_model,
-                st.session_state.messages,
-                system_prompt=summary_prompt
-            )
-            st.session_state.ai_summary = ai_summary
+        try:
+            with st.spinner("Crafting a summary of your path..."):
+                ai_summary = call_llm(
+                    st.session_state.current_model,
+                    st.session_state.messages,
+                    system_prompt=SUMMARY_PROMPT.format(final_choice=st.session_state.final_choice),
+                    journey_id=st.session_state.get("journey_id"),
+                    scenario=_rollup_scenario(),
+                    task="summary"
+                )
+        except RateLimitExceeded as e:
+            render_rate_limited(e)
+            return
+        st.session_state.ai_summary = ai_summary
 
     st.markdown("**Editable Summary**")
     edited_summary = st.text_area(
@@ -247,12 +248,16 @@ Focus on the ethical dimensions and emotional weight.
     if col1.button("Record This Choice", type="primary"):
         st.session_state.edited_summary = edited_summary
         try:
-            services.record_journey(
+            st.session_state.journey_queued = not services.record_journey(
+                st.session_state.get("current_scenario_id"),
                 st.session_state.current_scenario,
                 st.session_state.current_model,
                 st.session_state.final_choice,
                 st.session_state.edited_summary,
-                st.session_state.pseudonym
+                st.session_state.pseudonym,
+                journey_id=st.session_state.get("journey_id"),
+                messages=st.session_state.messages,
+                channel_id=st.session_state.get("journey_channel", services.DEFAULT_CHANNEL)
             )
             st.session_state.play_phase = "recorded"
             st.rerun(scope="app")
@@ -276,7 +281,12 @@ def render_play_page(scenarios):
 
     # Show Soundtrack link if available and journey has begun
     if st.session_state.play_phase != "setup" and "current_scenario" in st.session_state:
-        scenario = scenarios.get(st.session_state.current_scenario)
+        # By id, so a scenario renamed mid-journey is still found
+        scenario_id = st.session_state.get("current_scenario_id")
+        scenario = next(
+            (s for s in scenarios.values() if scenario_id and s.get("id") == scenario_id),
+            scenarios.get(st.session_state.current_scenario)
+        )
         if scenario and scenario.get("soundtrack"):
             st.sidebar.divider()
             st.sidebar.link_button("🎵 Recommended Soundtrack", scenario["soundtrack"], use_container_width=True)
@@ -293,15 +303,10 @@ def render_play_page(scenarios):
     elif st.session_state.play_phase == "recorded":
         render_recorded_fragment()
 
-def render_archive_page():
+def render_archive_page(channel_id):
     st.header("Recent Journeys")
     try:
-        journeys = conn.query("""
-            SELECT scenario_title, llm_model, choice_text, summary, author, submitted_at 
-            FROM journeys 
-            ORDER BY submitted_at DESC 
-            LIMIT 50
-        """, ttl=0) 
+        journeys = services.load_archive_page(channel_id)
         
         if journeys.empty:
             st.info("No recorded journeys yet. Be the first to shape history.")
@@ -313,16 +318,41 @@ def render_archive_page():
                     st.write(f"**Choice:** {row.choice_text}")
                     st.write("**Reflection:**")
                     st.write(row.summary)
+                    if row.has_transcript:
+                        render_transcript(row.id)
     except Exception as e:
         st.error(f"Could not load journeys: {e}")
 
-def check_admin_auth():
-    """Helper to check if the user is authenticated as an admin."""
+def render_transcript(journey_id):
+    """Full conversation behind a journey, fetched and decompressed only when asked for."""
+    opened = st.session_state.setdefault("open_transcripts", set())
+    if journey_id not in opened:
+        if st.button("📜 Show full transcript", key=f"transcript_{journey_id}"):
+            opened.add(journey_id)
+            st.rerun()
+        return
+    for msg in services.load_transcript(journey_id):
+        if msg["role"] == "system":
+            with st.popover("Scenario instructions"):
+                st.text(msg["content"])
+        else:
+            st.chat_message(msg["role"]).write(msg["content"])
+
+def current_channel():
+    return st.session_state.get("channel_id", services.DEFAULT_CHANNEL)
+
+def check_admin_auth(channel_id=None):
+    """
+    Helper to check if the user is authenticated as an admin, or as a moderator of `channel_id`.
+    Returns "admin", "moderator" or False.
+    """
     password_input = st.text_input("Admin Password", type="password")
     expected_hash = os.getenv("ADMIN_PASSWORD_HASH", "")
     
     if expected_hash and hashlib.sha256(password_input.encode()).hexdigest() == expected_hash:
-        return True
+        return "admin"
+    elif password_input and channel_id and services.is_channel_moderator(channel_id, password_input):
+        return "moderator"
     elif password_input:
         st.error("Incorrect password.")
         return False
@@ -330,10 +360,10 @@ def check_admin_auth():
         st.info("Enter admin password to access this section.")
         return False
 
-def render_propose_page(categories):
+def render_propose_page(categories, channel_id):
     st.header("Propose a New Choice")
     
-    if not check_admin_auth():
+    if not check_admin_auth(channel_id):
         return
 
     st.write("Submit a new ethical dilemma to the archive. Sensitive contributions may be embargoed.")
@@ -365,7 +395,17 @@ def render_propose_page(categories):
                 release_date = None
                 if embargo_option != "Immediate":
                     release_date = datetime.now() + relativedelta(months=months)
-                
+
+                # Near-duplicates are shown before anything is stored; submitting the same
+                # text again confirms it is meant as a separate scenario.
+                proposal = (title.strip(), description.strip(), prompt.strip())
+                duplicates = services.find_near_duplicates(*proposal)
+                if duplicates and st.session_state.get("confirmed_near_duplicate") != proposal:
+                    render_near_duplicates(duplicates)
+                    st.session_state.confirmed_near_duplicate = proposal
+                    st.info("Check the scenarios above. Submit again to propose yours anyway.")
+                    return
+
                 try:
                     services.propose_scenario(
                         title.strip(), 
@@ -375,29 +415,46 @@ def render_propose_page(categories):
                         category, 
                         release_date,
                         opening_scene.strip(),
-                        soundtrack.strip() or None
+                        soundtrack.strip() or None,
+                        channel_id
                     )
+                    st.session_state.pop("confirmed_near_duplicate", None)
                     st.success("Submitted! It will remain private until approved and any embargo expires.")
                     st.balloons()
                 except Exception:
                     st.error("Submission failed — likely duplicate title.")
 
-def render_curate_page(categories):
+def render_near_duplicates(matches):
+    if not matches:
+        return
+    lines = "\n".join(
+        f"- **{m['title']}** ({'live' if m['source'] == 'live' else 'pending'}) — ~{m['score']:.0%} similar"
+        for m in matches
+    )
+    st.warning(f"Possible near-duplicate of:\n{lines}")
+
+def render_curate_page(categories, channel_id):
     st.header("Curation & Moderation")
     
-    if check_admin_auth():
+    role = check_admin_auth(channel_id)
+    if role:
+        if role == "admin":
+            render_channel_admin()
+            render_profiler()
+
         all_entries = conn.query("""
-            SELECT 'Approved' as status, id, title, description, prompt, author, submitted_at, release_date, category, opening_scene, soundtrack
-            FROM scenarios
+            SELECT 'Approved' as status, id, title, description, prompt, author, submitted_at, release_date, category, opening_scene, soundtrack, channel_id
+            FROM scenarios WHERE channel_id = :channel
             UNION ALL
-            SELECT 'Pending' as status, id, title, description, prompt, author, submitted_at, release_date, category, opening_scene, soundtrack
-            FROM pending_scenarios WHERE status = 'pending'
+            SELECT 'Pending' as status, id, title, description, prompt, author, submitted_at, release_date, category, opening_scene, soundtrack, channel_id
+            FROM pending_scenarios WHERE status = 'pending' AND channel_id = :channel
             ORDER BY submitted_at DESC
-        """, ttl=0)
+        """, params={"channel": channel_id}, ttl=0)
 
         if all_entries.empty:
             st.success("No pending or approved scenarios.")
         else:
+            duplicates = services.near_duplicates_for_entries(all_entries)
             for row in all_entries.itertuples():
                 status_badge = "🟢 Live" if row.status == "Approved" else "🟡 Pending"
                 release_note = " — ✅ Immediate"
@@ -407,7 +464,9 @@ def render_curate_page(categories):
                     else:
                         release_note = " — ✅ Released"
                 
-                with st.expander(f"{status_badge} {row.title} ({row.category or 'Uncategorized'}) — by {row.author or 'Anonymous'} {release_note}"):
+                duplicate_badge = " ⚠️ Possible duplicate" if row.id in duplicates else ""
+                with st.expander(f"{status_badge} {row.title} ({row.category or 'Uncategorized'}) — by {row.author or 'Anonymous'} {release_note}{duplicate_badge}"):
+                    render_near_duplicates(duplicates.get(row.id))
                     st.write("**Description:**", row.description)
                     st.write("**Opening Scene:**", row.opening_scene)
                     st.write("**Soundtrack:**", row.soundtrack or "None")
@@ -421,9 +480,11 @@ def render_curate_page(categories):
                     if row.status == "Pending":
                         col1, col2 = st.columns(2)
                         if col1.button("Approve", key=f"app_{row.id}"):
-                            services.approve_scenario(row.id, row.title, row.description, row.prompt, row.author, row.category, row.release_date, row.opening_scene, row.soundtrack)
-                            st.success("Approved")
-                            st.rerun()
+                            if services.approve_scenario(row.id, row.title, row.description, row.prompt, row.author, row.category, row.release_date, row.opening_scene, row.soundtrack, row.channel_id):
+                                st.success("Approved")
+                                st.rerun()
+                            else:
+                                st.error(f"This channel already has a live scenario titled \"{row.title}\". Edit the title, then approve it.")
                         if col2.button("Reject", key=f"rej_{row.id}"):
                             services.reject_scenario(row.id)
                             st.info("Rejected")
@@ -431,7 +492,7 @@ def render_curate_page(categories):
                     
                     if row.status == "Approved" and row.release_date and row.release_date > datetime.now():
                         if st.button("Release Early", key=f"early_{row.id}"):
-                            services.release_scenario_early(row.id)
+                            services.release_scenario_early(row.id, row.channel_id)
                             st.success("Released early")
                             st.rerun()
 
@@ -447,10 +508,74 @@ def render_curate_page(categories):
                 st.divider()
                 edit_scenario_fragment(scenario_to_edit, categories)
 
-    elif password_input:
-        st.error("Incorrect password.")
-    else:
-        st.info("Enter admin password to access curation tools.")
+def render_channel_admin():
+    """Channel and moderator management, for the site admin only."""
+    with st.expander("📡 Channels & Moderators"):
+        channels = services.load_channels()
+        st.write(", ".join(f"**{c['name']}** (`{cid}`)" for cid, c in channels.items()))
+
+        with st.form("new_channel_form", clear_on_submit=True):
+            st.markdown("**New channel**")
+            new_id = st.text_input("Slug (lowercase letters, digits, dashes)", max_chars=40)
+            new_name = st.text_input("Name", max_chars=100)
+            new_description = st.text_input("Description", max_chars=300)
+            if st.form_submit_button("Create Channel"):
+                try:
+                    services.create_channel(new_id.strip(), new_name.strip() or new_id.strip(), new_description.strip() or None)
+                    st.success(f"Created channel {new_id}.")
+                except Exception as e:
+                    st.error(f"Could not create channel: {e}")
+
+        with st.form("new_moderator_form", clear_on_submit=True):
+            st.markdown("**Add or update a moderator** (hash from `generate_hash.py`)")
+            mod_channel = st.selectbox("Channel", options=list(channels), format_func=lambda c: channels[c]["name"])
+            mod_name = st.text_input("Moderator name", max_chars=50)
+            mod_hash = st.text_input("Password SHA-256 hash", max_chars=64)
+            if st.form_submit_button("Save Moderator"):
+                if not (mod_name.strip() and len(mod_hash.strip()) == 64):
+                    st.error("A name and a 64-character SHA-256 hash are required.")
+                else:
+                    services.add_channel_moderator(mod_channel, mod_name.strip(), mod_hash.strip().lower())
+                    st.success(f"{mod_name} can now moderate {channels[mod_channel]['name']}.")
+
+def render_profiler():
+    """Sampling profile of this admin session's next reruns, for finding out why a page is slow in production."""
+    with st.expander("🔬 Profile This Session"):
+        st.caption(
+            "Start, then use the slow page in this tab for the chosen number of reruns and fragment runs, and come back here. "
+            "Only this session is sampled; download the folded stacks for flamegraph.pl or speedscope."
+        )
+        col1, col2 = st.columns(2)
+        runs = col1.number_input("Runs to profile", min_value=1, max_value=profiler.MAX_RUNS, value=5)
+        if col2.button("Start Profiling"):
+            profiler.start(runs)
+
+        profile = profiler.current()
+        if profile is None:
+            return
+        if not profile["done"]:
+            st.info(f"Profiling: {len(profile['runs'])} of {profile['runs_wanted']} runs captured.")
+            if st.button("Stop Profiling"):
+                profiler.stop()
+                profile = profiler.current()
+        elif profile["expired"]:
+            st.warning(
+                f"Stopped after {profiler.MAX_PROFILE_SECONDS // 60} minutes with "
+                f"{len(profile['runs'])} of {profile['runs_wanted']} runs captured."
+            )
+
+        cols = st.columns(3)
+        for col, (category, label) in zip(cols, [("cpu", "Python"), ("db", "Database wait"), ("llm", "LLM wait")]):
+            col.metric(label, f"{profile['seconds'].get(category, 0) * 1000:,.0f} ms")
+        if profile["runs"]:
+            st.dataframe(profile["runs"], use_container_width=True)
+        if profile["top_frames"]:
+            st.markdown("**Hottest functions** (inclusive)")
+            st.dataframe(profile["top_frames"], use_container_width=True)
+            st.download_button(
+                "Download folded stacks", profile["folded"],
+                file_name=f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded", mime="text/plain"
+            )
 
 @st.fragment
 def edit_scenario_fragment(row, categories):
@@ -484,7 +609,8 @@ def edit_scenario_fragment(row, categories):
                     new_cat,
                     new_release_date,
                     new_opening.strip(),
-                    new_soundtrack.strip() or None
+                    new_soundtrack.strip() or None,
+                    row.channel_id
                 )
                 st.success("Changes saved!")
                 if "editing_scenario_id" in st.session_state:
@@ -498,6 +624,62 @@ def edit_scenario_fragment(row, categories):
                 del st.session_state.editing_scenario_id
             st.rerun(scope="app")
 
+OPS_WINDOWS = {"Last 24 hours": 1, "Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90}
+OPS_COUNTERS = ["plays", "journeys", "llm_calls", "llm_errors", "llm_latency_ms", "llm_latency_max_ms"]
+
+def _ops_summary(df):
+    """Counter sums plus derived error rate and mean latency for a slice of the rollup."""
+    totals = df[OPS_COUNTERS[:-1]].sum().astype(float)
+    successes = totals["llm_calls"] - totals["llm_errors"]
+    totals["error_rate"] = totals["llm_errors"] / totals["llm_calls"] if totals["llm_calls"] else 0.0
+    totals["avg_latency_s"] = totals["llm_latency_ms"] / successes / 1000 if successes else 0.0
+    totals["max_latency_s"] = df["llm_latency_max_ms"].max() / 1000
+    return totals
+
+def render_ops_page():
+    st.header("Operations")
+
+    if not check_admin_auth():
+        return
+
+    col1, col2 = st.columns(2)
+    window = col1.selectbox("Window", list(OPS_WINDOWS))
+    grain = col2.selectbox("Granularity", ["hour", "day"], index=0 if OPS_WINDOWS[window] <= 7 else 1)
+
+    rollup = services.get_ops_rollup(grain, datetime.now() - relativedelta(days=OPS_WINDOWS[window]))
+    if rollup.empty:
+        st.info("No activity recorded in this window yet.")
+        return
+
+    totals = _ops_summary(rollup)
+    cols = st.columns(5)
+    cols[0].metric("Plays", f"{int(totals['plays']):,}")
+    cols[1].metric("Journeys", f"{int(totals['journeys']):,}")
+    cols[2].metric("LLM Calls", f"{int(totals['llm_calls']):,}")
+    cols[3].metric("Error Rate", f"{totals['error_rate']:.1%}")
+    cols[4].metric("Avg Latency", f"{totals['avg_latency_s']:.1f}s", help=f"Slowest: {totals['max_latency_s']:.1f}s")
+
+    series = rollup.groupby("period")[OPS_COUNTERS].apply(_ops_summary)
+    st.subheader("Traffic")
+    st.line_chart(series[["plays", "journeys", "llm_calls"]])
+    st.subheader("LLM Latency & Errors")
+    st.line_chart(series[["avg_latency_s", "max_latency_s"]])
+    st.bar_chart(series[["error_rate"]])
+
+    for dimension, label in (("scenario", "By Scenario"), ("model", "By AI Mind")):
+        st.subheader(label)
+        breakdown = rollup.assign(**{dimension: rollup[dimension].replace("", "—")}).groupby(dimension)[OPS_COUNTERS].apply(_ops_summary)
+        st.dataframe(
+            breakdown[["plays", "journeys", "llm_calls", "error_rate", "avg_latency_s", "max_latency_s"]]
+            .sort_values("plays", ascending=False),
+            use_container_width=True
+        )
+
+    health = router.health_report()
+    if health:
+        st.subheader("Backends (this server, rolling window)")
+        st.dataframe([{"backend": model, **stats} for model, stats in health.items()], use_container_width=True)
+
 @st.fragment
 def render_recorded_fragment():
     st.balloons()
@@ -507,10 +689,12 @@ def render_recorded_fragment():
     st.write(f"**By:** {st.session_state.pseudonym or 'Anonymous'}")
     st.markdown("**Your Reflection:**")
     st.write(st.session_state.edited_summary)
+    if st.session_state.get("journey_queued"):
+        st.info("The archive is out of reach for the moment. Your journey is saved here and will appear there once it returns.")
 
     if st.button("Begin New Journey", type="primary"):
         keys_to_reset = [
-            "messages", "current_scenario", "current_model", 
+            "messages", "current_scenario", "current_scenario_id", "current_model", "journey_id", "journey_channel", "journey_queued",
             "play_phase", "final_choice", "generated_choices", 
             "ai_summary", "edited_summary", "custom_choice_input", "summary_editor"
         ]